@@ -0,0 +1,388 @@
+"""
+Headless benchmark suite. Runs without tkinter, mss or a display.
+
+    python benchmark.py                      # all sections, JSON to stdout
+    python benchmark.py -o bench.json        # write results to a file
+    python benchmark.py --compare old.json   # flag regressions vs an earlier run
+
+Each timing is reported pytest-benchmark style (min/max/mean/median/stddev/rounds).
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import capture
+from capture import FileCaptureBackend, MssCaptureBackend, screenshot_to_array
+from game_logic import StoneFacetingLogic, get_all_targets
+from logger import fields, setup_logging, shutdown_logging
+from ocr_subproject.new_ocr import NewOcrEngine, sample_inputs
+from qtable_cache import QTableCache, QTableStore
+from solver import DEFAULT_SPEC, normalize_state, outcome_distribution, solve_q_table
+from overlay_geometry import ocr_box_size, overlay_coords
+from vision import Vision, array_to_image
+from vision_check import synthetic_frame
+
+
+def timing_stats(samples):
+    """Summary of a list of durations in seconds."""
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.mean(samples),
+        "median": statistics.median(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": len(samples),
+    }
+
+
+def bench(func, rounds=100, warmup=1):
+    """Call func() rounds times (after warmup calls) and return timing stats."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return timing_stats(samples)
+
+
+def random_slot_states(spec, count, seed=0):
+    """Random mid-game (slots, probability) pairs reachable by normal play."""
+    rng = random.Random(seed)
+    states = []
+    for _ in range(count):
+        slots = {'row1': [-1] * spec.slots, 'row2': [-1] * spec.slots, 'row3': [-1] * spec.slots}
+        p_idx = spec.start_p_idx
+        for _ in range(rng.randint(0, 3 * spec.slots - 1)):
+            row = rng.choice([r for r, s in slots.items() if -1 in s])
+            success = rng.random() < spec.probs[p_idx]
+            slots[row][slots[row].index(-1)] = 1 if success else 0
+            p_idx = spec.next_p_idx(p_idx, success)
+        states.append((slots, spec.probs[p_idx]))
+    return states
+
+
+def normalization_stats(logic, states):
+    """How many distinct game states share a table entry once normalized (clamped)."""
+    t1, t2, t3 = logic.get_q_table().targets
+    raw, entries = set(), set()
+    for slots, probability in states:
+        logic.slots, logic.current_probability = slots, probability
+        state = logic.get_state_params()
+        raw.add(state)
+        entries.add(normalize_state(*state, t1, t2, t3))
+    return {
+        "raw_states": len(raw),
+        "table_entries": len(entries),
+        "shared_rate": 1 - len(entries) / len(raw),
+    }
+
+
+def bench_settings_switch(cache, tables, spec=DEFAULT_SPEC, switches=40, seed=0):
+    """
+    Random goal/penalty switches through a QTableStore that only has room for
+    two tables, backed by the disk cache. Reports the store (in memory) and
+    disk cache hit rates, evictions and the latency of each switch.
+    """
+    targets = list(tables)
+    store = QTableStore(cache, max_bytes=2 * max(table.nbytes for table in tables.values()))
+    logic = StoneFacetingLogic(table_store=store, spec=spec)
+    rng = random.Random(seed)
+    cache.stats.reset()
+    samples = []
+    for _ in range(switches):
+        t1, t2, t3 = rng.choice(targets)
+        start = time.perf_counter()
+        logic.set_targets(t1, t2)
+        logic.set_penalty_limit(t3)
+        logic.get_q_table()
+        samples.append(time.perf_counter() - start)
+    return {
+        "switches": switches,
+        "max_tables": 2,
+        "store": store.stats.as_dict(),
+        "disk": cache.stats.as_dict(),
+        "evictions": store.evictions,
+        "switch": timing_stats(samples),
+    }
+
+
+def bench_solver(spec=DEFAULT_SPEC, lookup_rounds=2000):
+    """
+    Cold solve, disk load, warm lookups and table size for every GUI target
+    setting, then goal/penalty switching under a memory limit.
+    """
+    results = {}
+    states = random_slot_states(spec, lookup_rounds)
+    tmp = tempfile.TemporaryDirectory()
+    cache = QTableCache(tmp.name)
+    tables = {}
+
+    for t1, t2, t3 in get_all_targets():
+        # Cold solve, then peak memory in a second run (tracemalloc slows the solve down)
+        start = time.perf_counter()
+        table = solve_q_table(t1, t2, t3, spec)
+        cold = time.perf_counter() - start
+        tracemalloc.start()
+        solve_q_table(t1, t2, t3, spec)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Load from the on-disk cache (memory-mapped)
+        cache.save(table)
+        tables[(t1, t2, t3)] = table
+        load = bench(lambda: cache.load(t1, t2, t3, spec), rounds=5)
+
+        # Warm recommend_move latency over random game states
+        store = QTableStore()
+        logic = StoneFacetingLogic(table_store=store, spec=spec)
+        logic.set_targets(t1, t2)
+        logic.set_penalty_limit(t3)
+        logic.get_q_table()
+        it = iter(states * 2)
+
+        def _recommend():
+            logic.slots, logic.current_probability = next(it)
+            logic.recommend_move()
+
+        lookup = bench(_recommend, rounds=lookup_rounds, warmup=0)
+
+        # Full outcome distribution from an empty stone (one forward pass)
+        start_state = (spec.slots,) * 3 + (0, 0, 0, spec.start_p_idx)
+        outcome = bench(lambda: outcome_distribution(table, *start_state), rounds=3)
+
+        results[f"{t1}{t2}{t3}"] = {
+            "targets": [t1, t2, t3],
+            "cold_solve_s": cold,
+            "peak_memory_bytes": peak,
+            "table_bytes": table.nbytes,
+            "memoized_states": table.q.size // 3,
+            "disk_load": load,
+            "recommend_move": lookup,
+            "outcome_distribution": outcome,
+            "normalization": normalization_stats(logic, states),
+        }
+
+    with tmp:
+        results["settings_switch"] = bench_settings_switch(cache, tables, spec)
+    return results
+
+
+def bench_vision(rounds=200):
+    """Slot analysis per frame: vectorized analyze_state vs the per-pixel reference."""
+    results = {}
+    for name in ("FHD", "QHD"):
+        coords = overlay_coords(name)
+        frame = synthetic_frame(Vision(coords), np.random.default_rng(0), 480, 640)
+        vision = Vision(coords, FileCaptureBackend([frame]))
+        region = {'x': 0, 'y': 0, 'width': 640, 'height': 480}
+        img = array_to_image(frame)
+        results[name] = {
+            "analyze_state": bench(lambda: vision.analyze_state(region), rounds=rounds),
+            "reference": bench(lambda: vision.analyze_image_reference(img), rounds=rounds // 10),
+        }
+    return results
+
+
+def bench_capture(rounds=100):
+    """Overlay-sized grab: new mss session per call vs one persistent session."""
+    region = {'top': 0, 'left': 0, 'width': 600, 'height': 450}
+    if capture.mss is None:
+        return {"skipped": "mss not installed"}
+
+    def _session_per_call():
+        with capture.mss.mss() as sct:
+            screenshot_to_array(sct.grab(region))
+
+    with MssCaptureBackend() as backend:
+        persistent = bench(lambda: backend.grab(region), rounds=rounds)
+        histogram = backend.latency.as_dict()
+    return {
+        "session_per_call": bench(_session_per_call, rounds=rounds),
+        "persistent": persistent,
+        "persistent_histogram": histogram,
+    }
+
+
+def bench_ocr(rounds=500):
+    """NewOcrEngine.predict (batched templates) vs the per-template cv2 loop, per resolution."""
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_subproject")
+    engine = NewOcrEngine(base_dir, cache_size=0)
+    cached = NewOcrEngine(base_dir)
+    results = {}
+    for resolution in engine.template_stacks:
+        box = ocr_box_size(resolution)
+        inputs = sample_inputs(engine, resolution, box, count=5)
+        processed = [engine.preprocess_input(img, resolution) for img in inputs]
+        stack = engine.template_stacks[resolution]
+        templates = engine.templates[resolution]
+        it, ref_it = itertools.cycle(inputs), itertools.cycle(inputs)
+        proc_it, loop_it = itertools.cycle(processed), itertools.cycle(processed)
+
+        def _match_loop():
+            img = next(loop_it)
+            for _, template in templates:
+                cv2.minMaxLoc(cv2.matchTemplate(img, template, cv2.TM_CCOEFF_NORMED))
+
+        # Same digit image over and over, as between slot fills
+        cached.cache_hits = cached.cache_misses = 0
+        predict_cached = bench(lambda: cached.predict(inputs[1], resolution), rounds=rounds)
+
+        results[resolution] = {
+            "predict": bench(lambda: engine.predict(next(it), resolution), rounds=rounds),
+            "predict_cached": predict_cached,
+            "cache": cached.cache_stats(),
+            "predict_reference": bench(lambda: engine.predict_reference(next(ref_it), resolution), rounds=rounds),
+            "match_batched": bench(lambda: stack.match(next(proc_it)), rounds=rounds),
+            "match_loop": bench(_match_loop, rounds=rounds),
+            # Template bucket for a non-native UI scale (done off the GUI thread)
+            "bank_build": bench(lambda: engine.bank.build(resolution, 1.1, box), rounds=5),
+        }
+    return results
+
+
+def bench_logging(rounds=5000):
+    """
+    Caller-side cost of one INFO record through the queue logger (rotating
+    file sink, no console), of a filtered DEBUG record, and of the flushed
+    print it replaces.
+    """
+    log = logging.getLogger("benchmark")
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_logging("INFO", log_file=os.path.join(tmp, "bench.log"), console=False)
+        try:
+            info = bench(lambda: log.info("OCR Prediction: %s", "5", extra=fields(score=0.93, margin=0.21)),
+                         rounds=rounds)
+            debug = bench(lambda: log.debug("Settings saved."), rounds=rounds)
+        finally:
+            # Includes the listener thread writing out everything still queued
+            start = time.perf_counter()
+            shutdown_logging()
+            drain = time.perf_counter() - start
+            # Back to the logging defaults for the other sections
+            logging.getLogger().setLevel(logging.WARNING)
+
+        with open(os.path.join(tmp, "print.log"), 'w') as f:
+            printed = bench(lambda: print(f"OCR Prediction: {'5'} (Conf: {0.93:.2f})", file=f, flush=True),
+                            rounds=rounds)
+
+    return {
+        "info": info,
+        "debug_filtered": debug,
+        "print_flush": printed,
+        "drain_s": drain,
+        "records": 2 * rounds + 2,
+    }
+
+
+SECTIONS = {
+    "solver": bench_solver,
+    "vision": bench_vision,
+    "capture": bench_capture,
+    "ocr": bench_ocr,
+    "logging": bench_logging,
+}
+
+# (section, metric path) checked by --compare; higher is worse
+REGRESSION_KEYS = [
+    ("solver", "cold_solve_s"),
+    ("solver", "recommend_move.median"),
+    ("solver", "disk_load.median"),
+    ("solver", "outcome_distribution.median"),
+    ("solver", "peak_memory_bytes"),
+    ("vision", "analyze_state.median"),
+    ("capture", "persistent.median"),
+    ("ocr", "predict.median"),
+    ("logging", "info.median"),
+]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def get_metric(entry, path):
+    for key in path.split("."):
+        entry = entry.get(key) if isinstance(entry, dict) else None
+    return entry
+
+
+def compare(old, new, threshold=0.10):
+    """Print metrics that got more than `threshold` worse. Returns the count."""
+    regressions = 0
+    for section, path in REGRESSION_KEYS:
+        for name, entry in new.get(section, {}).items():
+            before = get_metric(old.get(section, {}).get(name, {}), path)
+            after = get_metric(entry, path)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = "REGRESSION" if change > threshold else "ok"
+            if change > threshold:
+                regressions += 1
+            print(f"{flag:10s} {section}/{name}/{path}: {before:.6g} -> {after:.6g} ({change:+.1%})",
+                  file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sections", nargs="*",
+                        help=f"sections to run: {', '.join(SECTIONS)} (default: all)")
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+    unknown = set(args.sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        }
+    }
+    for name in args.sections or SECTIONS:
+        print(f"Running {name} benchmark...", file=sys.stderr)
+        # Keep stdout clean for the JSON output
+        with contextlib.redirect_stdout(sys.stderr):
+            results[name] = SECTIONS[name]()
+
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, 'r') as f:
+            old = json.load(f)
+        if compare(old, results):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Screen capture backends. All grabs return an (H, W, 4) BGRA uint8 array.
+
+    MssCaptureBackend   long-lived mss session, bound to the thread that opened it
+    PerThreadCapture    one MssCaptureBackend per calling thread (what Vision uses live)
+    FileCaptureBackend  serves crops of saved screenshots, for headless runs
+
+open_frame_source() picks one of them from a name: "live", a directory of
+PNG frames or a compressed .npz session (see save_session).
+"""
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from logger import get_logger
+from perf import LatencyHistogram
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+log = get_logger(__name__)
+
+
+def screenshot_to_array(screenshot):
+    """Zero-copy (H, W, 4) BGRA view of an mss screenshot buffer."""
+    return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+
+
+class CaptureBackend:
+    """
+    Interface for screen capture. Subclasses implement _grab(region), where
+    region is an mss-style dict (top, left, width, height) in screen pixels.
+    grab() records every call in self.latency.
+    """
+    def __init__(self, latency=None):
+        self.latency = latency if latency is not None else LatencyHistogram("capture")
+
+    def open(self):
+        return self
+
+    def close(self):
+        pass
+
+    def close_thread(self):
+        """Release whatever the calling thread holds (no-op unless per-thread)."""
+        pass
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def grab(self, region):
+        start = time.perf_counter()
+        try:
+            return self._grab(region)
+        finally:
+            self.latency.record(time.perf_counter() - start)
+
+    def _grab(self, region):
+        raise NotImplementedError
+
+
+class MssCaptureBackend(CaptureBackend):
+    """
+    One mss session kept open between grabs, so its device contexts and
+    bitmap are reused instead of rebuilt per capture. mss sessions are not
+    thread-safe: the backend belongs to the thread that opened it.
+    """
+    def __init__(self, latency=None):
+        super().__init__(latency)
+        self.sct = None
+        self.owner = None
+
+    def open(self):
+        if mss is None:
+            raise RuntimeError("mss is not installed")
+        if self.sct is None:
+            self.sct = mss.mss()
+            self.owner = threading.get_ident()
+        return self
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+            self.owner = None
+
+    def _grab(self, region):
+        if self.sct is None:
+            self.open()
+        elif self.owner != threading.get_ident():
+            raise RuntimeError("MssCaptureBackend used from a thread that does not own it")
+        return screenshot_to_array(self.sct.grab(region))
+
+
+class PerThreadCapture(CaptureBackend):
+    """
+    Opens one MssCaptureBackend per calling thread on first use (the scan
+    loop and the Tk thread both capture). close_thread() releases the
+    caller's session, close() releases all of them.
+    """
+    def __init__(self, factory=MssCaptureBackend, latency=None):
+        super().__init__(latency)
+        self.factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._backends = {}
+
+    def get_backend(self):
+        backend = getattr(self._local, 'backend', None)
+        if backend is None:
+            # Timing is recorded once, by our own grab()
+            backend = self.factory(latency=LatencyHistogram()).open()
+            self._local.backend = backend
+            with self._lock:
+                self._backends[threading.get_ident()] = backend
+        return backend
+
+    def _grab(self, region):
+        return self.get_backend()._grab(region)
+
+    def close_thread(self):
+        backend = getattr(self._local, 'backend', None)
+        if backend is not None:
+            self._local.backend = None
+            with self._lock:
+                self._backends.pop(threading.get_ident(), None)
+            backend.close()
+
+    def close(self):
+        with self._lock:
+            backends = list(self._backends.values())
+            self._backends.clear()
+        for backend in backends:
+            try:
+                backend.close()
+            except Exception as e:
+                log.warning("Error closing capture session: %s", e)
+
+
+class FileCaptureBackend(CaptureBackend):
+    """
+    Serves grabs from saved screenshots (PNG paths or BGR/BGRA arrays) as if
+    they were the screen, with the image's top-left at `origin`. Pixels
+    outside the image read as black. next_frame() steps to the next image.
+    """
+    def __init__(self, frames, origin=(0, 0), loop=False, latency=None):
+        super().__init__(latency)
+        self.frames = list(frames)
+        self.origin = tuple(origin)
+        self.loop = loop
+        self.index = 0
+        self._cache = {}
+
+    def load(self, index):
+        if index not in self._cache:
+            frame = self.frames[index]
+            if isinstance(frame, str):
+                frame = cv2.imread(frame, cv2.IMREAD_UNCHANGED)
+                if frame is None:
+                    raise IOError(f"Could not read {self.frames[index]}")
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+            elif frame.shape[2] == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+            self._cache = {index: frame}
+        return self._cache[index]
+
+    def next_frame(self):
+        """Advance to the next image. Returns False when out of frames."""
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+            return True
+        if self.loop and self.frames:
+            self.index = 0
+            return True
+        return False
+
+    def _grab(self, region):
+        frame = self.load(self.index)
+        top = region['top'] - self.origin[1]
+        left = region['left'] - self.origin[0]
+        h, w = region['height'], region['width']
+
+        out = np.zeros((h, w, 4), dtype=np.uint8)
+        y0, x0 = max(0, top), max(0, left)
+        y1, x1 = min(frame.shape[0], top + h), min(frame.shape[1], left + w)
+        if y1 > y0 and x1 > x0:
+            out[y0 - top:y1 - top, x0 - left:x1 - left] = frame[y0:y1, x0:x1]
+        return out
+
+
+# Session metadata file inside a PNG frame directory
+SESSION_META = "session.json"
+
+
+def save_session(path, frames, meta):
+    """
+    Write equally sized BGRA frames and a JSON-able meta dict to one
+    compressed .npz. meta should hold what a replay needs: the screen
+    origin of the frames, the overlay region and coords, resolution, scale.
+    """
+    np.savez_compressed(path, frames=np.stack(frames), meta=np.array(json.dumps(meta)))
+
+
+def load_session(path):
+    """(frames, meta) of a .npz session or of a directory of PNG frames."""
+    if os.path.isdir(path):
+        frames = sorted(os.path.join(path, name) for name in os.listdir(path)
+                        if name.lower().endswith(".png"))
+        meta_path = os.path.join(path, SESSION_META)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        return frames, meta
+    with np.load(path) as data:
+        return data['frames'], json.loads(str(data['meta']))
+
+
+def open_frame_source(source):
+    """
+    Capture backend for a frame source, plus the session meta ({} when live):
+        "live"        PerThreadCapture (mss)
+        <directory>   PNG frames in name order, meta from its session.json
+        <file>.npz    session written by save_session
+    Session logs (.fses, recorder.py) hold slot states and OCR crops, not
+    frames: read them with recorder.read_session_log or ocr_eval.py.
+    """
+    if source == "live":
+        return PerThreadCapture(), {}
+    if str(source).lower().endswith(".fses"):
+        raise ValueError(f"{source} is a session log without frames; see recorder.py / ocr_eval.py")
+    frames, meta = load_session(source)
+    if len(frames) == 0:
+        raise IOError(f"No frames in {source}")
+    return FileCaptureBackend(frames, origin=meta.get('origin', (0, 0))), meta
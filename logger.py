@@ -0,0 +1,108 @@
+"""
+Non-blocking logging. Loggers only put records on a queue; one listener
+thread formats them and writes the console and a rotating log file.
+
+    from logger import fields, get_logger
+    log = get_logger(__name__)
+    log.info("OCR prediction %s", label, extra=fields(score=score, margin=margin))
+
+main.py calls setup_logging() once. Without it (headless tools), modules
+log through the logging defaults: warnings and errors to stderr.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+CONSOLE_FORMAT = "%(levelname)s %(name)s: %(message)s"
+
+_listener = None
+_handler = None
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def fields(**values):
+    """extra= for a record with key=value fields appended to the message."""
+    return {"fields": values}
+
+
+class FieldsFormatter(logging.Formatter):
+    """Formats extra=fields(...) as ' key=value ...' after the message."""
+    def format(self, record):
+        text = super().format(record)
+        values = getattr(record, "fields", None)
+        if values:
+            text += " " + " ".join(f"{k}={v}" for k, v in values.items())
+        return text
+
+
+class EnqueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. The stock
+    prepare() merges args into the message on the caller's thread; records
+    never leave the process here, so they can be queued as they are.
+    """
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level="INFO", log_file="bot.log", max_bytes=1024 * 1024, backup_count=3, console=True):
+    """
+    Route the root logger through a queue to a console handler and a
+    RotatingFileHandler (log_file=None: console only). Safe to call again;
+    the previous listener is stopped first. Returns the QueueListener.
+    """
+    global _listener, _handler
+    shutdown_logging()
+
+    sinks = []
+    if console:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(FieldsFormatter(CONSOLE_FORMAT))
+        sinks.append(handler)
+    if log_file:
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                       backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(FieldsFormatter(LOG_FORMAT))
+        sinks.append(handler)
+
+    # Skip per-record work the formats do not use (see "Optimization" in the logging docs)
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    _handler = EnqueueHandler(log_queue)
+    root.addHandler(_handler)
+    set_level(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def set_level(level):
+    logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def shutdown_logging():
+    """Flush queued records, stop the listener thread and detach the queue."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,19 +1,28 @@
 import tkinter as tk
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import keyboard
 import pyautogui
 import ctypes
 import os
-import cv2
 from overlay_gui import ControlPanel
-from game_logic import StoneFacetingLogic
-from vision import Vision
+from game_logic import StoneFacetingLogic, GOAL_TARGETS, PENALTY_LIMITS, get_all_targets
+from qtable_cache import QTableCache, QTableStore
+from vision import PatchChangeDetector, Vision
 from ocr_subproject.new_ocr import NewOcrEngine
 from settings_manager import SettingsManager
+from perf import Instrumentation, LatencyHistogram
+from scheduler import ScanScheduler
+from recorder import SessionRecorder
+from logger import fields, get_logger, set_level, setup_logging, shutdown_logging
+
+log = get_logger(__name__)
 
 class BotController:
-    SAVE_CAPTURES = False # Configuration flag
+    SAVE_CAPTURES = False # Record a session log (recorder.py) under captures/ while running
+    PERF_DUMP = "perf_stats.json" # Stage timings written on exit
 
     def __init__(self):
         self.root = tk.Tk()
@@ -31,8 +40,10 @@ class BotController:
         )
         self.vision = Vision(self.gui.get_overlay_coords())
         self.ocr = NewOcrEngine()
-        self.logic = StoneFacetingLogic()
+        self.table_store = QTableStore(QTableCache())
+        self.logic = StoneFacetingLogic(table_store=self.table_store)
         self.settings_manager = SettingsManager()
+        set_level(self.settings_manager.get("log_level") or "INFO")
         
         # Load Settings
         saved_goal = self.settings_manager.get("goal")
@@ -47,18 +58,20 @@ class BotController:
         self.gui.penalty_var.set(saved_penalty)
         
         # Apply to Logic
-        if saved_goal == "97":
-            self.logic.set_targets(9, 7)
-        else:
-            self.logic.set_targets(9, 6)
-            
-        self.logic.set_penalty_limit(5 if saved_penalty else 4)
+        self.logic.set_targets(*GOAL_TARGETS.get(saved_goal, (9, 6)))
+        self.logic.set_penalty_limit(PENALTY_LIMITS[bool(saved_penalty)])
+        
+        # OCR box drawn outside the captured pixels unless the legacy hide mode is set
+        self.ocr_box_mode = self.settings_manager.get("ocr_box_mode")
+        self.gui.overlay.set_ocr_box_mode(self.ocr_box_mode)
         
         # Apply Resolution to Overlay
         self.gui.overlay.set_resolution(saved_res)
         
         # Apply Scale
         self.gui.set_scale(saved_scale)
+        self.ui_scale = saved_scale
+        self.prewarm_ocr(saved_res, saved_scale)
         
         # Restore Overlay Position
         x = self.settings_manager.get("overlay_x")
@@ -69,6 +82,20 @@ class BotController:
         self.thread = None
         self.needs_reset = False
         self.is_calculating = False
+        self.prewarm_started = False
+        
+        # Capture request -> OCR prediction, including any overlay hide round-trip
+        self.ocr_latency = LatencyHistogram("capture->OCR")
+        # Rolling p50/p95/p99 per scan loop stage, shown in the control panel
+        self.spans = Instrumentation()
+        self.gui.set_stats_source(lambda: self.spans.format() + "\n" + self.gui.overlay.format_redraw_stats())
+        
+        # Session log of the running scan loop (SAVE_CAPTURES); on_close flushes it
+        self.recorder = None
+        
+        # Outcome distribution runs on its own worker so the scan loop never waits
+        self.outcome_executor = ThreadPoolExecutor(max_workers=1)
+        self.outcome_request = None
         
         # Start initial calculation
         self.recalculate_logic()
@@ -76,7 +103,7 @@ class BotController:
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def on_close(self):
-        print("Closing Application...")
+        log.info("Closing Application...")
         
         # Save Overlay Position
         try:
@@ -89,51 +116,79 @@ class BotController:
                 y = int(parts[3])
                 self.settings_manager.set("overlay_x", x)
                 self.settings_manager.set("overlay_y", y)
-                print(f"Saved Overlay Position: {x}, {y}")
+                log.info("Saved Overlay Position: %d, %d", x, y)
         except Exception as e:
-            print(f"Error saving position: {e}")
+            log.error("Error saving position: %s", e)
             
         self.running = False
+        log.info(self.vision.capture.latency.format())
+        log.info(self.ocr_latency.format())
+        log.info("OCR cache: %s", self.ocr.cache_stats())
+        log.info("Stage timings:\n%s", self.spans.format())
+        log.info(self.gui.overlay.format_redraw_stats())
+        try:
+            self.spans.dump(self.PERF_DUMP, extra={
+                "capture": self.vision.capture.latency.as_dict(),
+                "capture_to_ocr": self.ocr_latency.as_dict(),
+                "ocr_cache": self.ocr.cache_stats(),
+            })
+            log.info("Saved stage timings to %s", self.PERF_DUMP)
+        except Exception as e:
+            log.error("Error saving stage timings: %s", e)
+        # os._exit kills the writer thread: write out the queued records first
+        self.close_recorder()
+        self.vision.close()
         self.root.destroy()
+        # os._exit skips atexit: flush the log queue first
+        shutdown_logging()
         import os
         os._exit(0) # Force exit to kill any hanging threads
 
     def on_resolution_change(self, res):
-        print(f"Resolution changed to {res}")
+        log.info("Resolution changed to %s", res)
         self.settings_manager.set("resolution", res)
         # Update Vision coordinates
         new_coords = self.gui.get_overlay_coords()
         self.vision.update_coords(new_coords)
+        self.prewarm_ocr(res, self.ui_scale)
 
     def on_goal_change(self, value):
         self.settings_manager.set("goal", value)
-        if value == "97":
-            self.logic.set_targets(9, 7)
-        elif value == "96":
-            self.logic.set_targets(9, 6)
+        if value in GOAL_TARGETS:
+            self.logic.set_targets(*GOAL_TARGETS[value])
         
         self.recalculate_logic()
 
     def on_penalty_change(self, value):
         self.settings_manager.set("penalty_allowed", value)
         # value is boolean
-        limit = 5 if value else 4
+        limit = PENALTY_LIMITS[bool(value)]
         self.logic.set_penalty_limit(limit)
         
         self.recalculate_logic()
 
     def on_scale_change(self, value):
-        print(f"UI Scale changed to {value}")
+        log.info("UI Scale changed to %s", value)
         self.settings_manager.set("ui_scale", value)
         # Vision coords update is handled by overlay update -> get_overlay_coords
         # But we need to push new coords to vision
         new_coords = self.gui.get_overlay_coords()
         self.vision.update_coords(new_coords)
+        self.ui_scale = value
+        self.prewarm_ocr(self.gui.resolution_var.get(), value)
+
+    def prewarm_ocr(self, resolution, scale):
+        """Build OCR templates for this resolution/scale and the overlay's OCR box off the GUI thread."""
+        box = self.gui.get_overlay_coords()['prob_ocr_box']
+        self.ocr.bank.prewarm(resolution, scale, (box['y2'] - box['y1'], box['x2'] - box['x1']))
+
+    def get_current_targets(self):
+        return (self.logic.target_r1_primary, self.logic.target_r2_secondary, self.logic.target_r3_max)
 
     def recalculate_logic(self):
         """
         Calculate probability for CURRENT settings only.
-        Blocks start button until done.
+        Blocks start button until done. Instant if the table is already in the store.
         """
         if self.is_calculating: return
 
@@ -141,27 +196,28 @@ class BotController:
         self.gui.set_start_enabled(False)
         self.gui.update_status("Calculating... Please Wait")
         self.gui.update_probability_text("Win Prob: Calculating...")
+        self.gui.update_outcome_text("")
         self.gui.highlight_recommendation(None)
         
         def _calc():
-            print("Starting calculation for current settings...")
-            # Initial state: 10 empty slots per row, 75% prob (p_idx=5)
-            c1, c2, c3 = 10, 10, 10
-            s1, s2, s3 = 0, 0, 0
-            p_idx = 5 # 0.75
-            
-            # Use current targets from logic
-            t1 = self.logic.target_r1_primary
-            t2 = self.logic.target_r2_secondary
-            t3 = self.logic.target_r3_max
+            log.info("Starting calculation for current settings...")
+            # Load the Q-table from qtables/ (or solve and save it on first run)
+            targets = self.get_current_targets()
+            self.logic.get_q_table()
+            log.info("Calculation Complete.")
             
-            # Run calculation
-            self.logic.solve(c1, c2, c3, s1, s2, s3, p_idx, t1, t2, t3)
-            print("Calculation Complete.")
+            # Pre-warm the other goal/penalty combinations in the background
+            if not self.prewarm_started:
+                self.prewarm_started = True
+                self.table_store.prewarm([t for t in get_all_targets() if t != targets])
             
             # Update UI on main thread
             def _done():
                 self.is_calculating = False
+                if self.get_current_targets() != targets:
+                    # Settings changed while calculating
+                    self.recalculate_logic()
+                    return
                 self.gui.set_start_enabled(True)
                 self.gui.update_status("Ready - Press START")
                 self.update_recommendation(force=True)
@@ -171,7 +227,7 @@ class BotController:
         threading.Thread(target=_calc, daemon=True).start()
 
     def reset_bot(self):
-        print("Resetting Bot State...")
+        log.info("Resetting Bot State...")
         self.logic.reset()
         self.gui.highlight_recommendation(None)
         # Clear debug circles
@@ -186,7 +242,7 @@ class BotController:
             self.running = True
             self.thread = threading.Thread(target=self.run_loop)
             self.thread.start()
-            print("Bot Started - Assist Mode")
+            log.info("Bot Started - Assist Mode")
 
     def stop_bot(self):
         self.running = False
@@ -196,16 +252,24 @@ class BotController:
         #     self.thread.join()
         
         self.gui.stop(from_logic=True) 
-        print("Bot Stopped")
+        log.info("Bot Stopped")
 
     def test_click(self):
-        print("Test Click Disabled in Assist Mode")
+        log.info("Test Click Disabled in Assist Mode")
 
-    def capture_ocr_clean(self, region, coords):
+    def capture_frame_clean(self, region, coords):
         """
-        Captures OCR image while temporarily hiding the orange box.
+        Captures one frame (overlay region + OCR box) for slot analysis and OCR.
+        In 'outside' mode the orange box is drawn around the captured pixels, so no GUI sync is needed.
+        In legacy 'hide' mode the box is temporarily hidden around the grab.
         Handles both Main Thread and Background Thread calls safely.
         """
+        start = time.perf_counter()
+        if self.ocr_box_mode != 'hide':
+            frame = self.vision.capture_frame(region, coords)
+            frame.requested_at = start
+            return frame
+        
         # We need to access the overlay window directly to force update
         # self.gui is ControlPanel, self.gui.overlay is VisualOverlay
         overlay_window = self.gui.overlay
@@ -216,10 +280,11 @@ class BotController:
             # Force update is already in set_ocr_box_visibility, but let's be sure
             # overlay_window.update() 
             
-            img = self.vision.get_ocr_image(region, coords)
+            frame = self.vision.capture_frame(region, coords)
+            frame.requested_at = start
             
             overlay_window.set_ocr_box_visibility(True)
-            return img
+            return frame
         else:
             # Background Thread: Schedule and Wait
             event = threading.Event()
@@ -228,20 +293,22 @@ class BotController:
                 overlay_window.set_ocr_box_visibility(False)
                 event.set()
             
-            self.root.after(0, _hide)
-            event.wait() # Block until hidden and updated
-            
-            # Tiny sleep to ensure OS compositor has painted the transparency
-            # time.sleep(0.01) 
-            
-            img = self.vision.get_ocr_image(region, coords)
-            
-            # Show (Async is fine, no need to wait)
-            self.root.after(0, lambda: overlay_window.set_ocr_box_visibility(True))
-            return img
+            with self.spans.span("ocr_hide_show"):
+                self.root.after(0, _hide)
+                event.wait() # Block until hidden and updated
+                
+                # Tiny sleep to ensure OS compositor has painted the transparency
+                # time.sleep(0.01) 
+                
+                frame = self.vision.capture_frame(region, coords)
+                frame.requested_at = start
+                
+                # Show (Async is fine, no need to wait)
+                self.root.after(0, lambda: overlay_window.set_ocr_box_visibility(True))
+            return frame
 
     def run_loop(self):
-        print("Bot Running - Continuous Scan Mode")
+        log.info("Bot Running - Continuous Scan Mode")
         
         # Initial State
         last_row_states = {
@@ -250,6 +317,24 @@ class BotController:
             'row3': [-1]*10
         }
         
+        # Skips classification/redraws while the slots do not change
+        slot_changes = PatchChangeDetector()
+        # Slow polling while idle, fast right after a change
+        scheduler = ScanScheduler.from_settings(self.settings_manager)
+        last_frame_time = None
+        # OCR results of the latest settle frames, combined by NewOcrEngine.vote
+        ocr_votes = deque(maxlen=max(1, int(self.settings_manager.get("ocr_vote_frames") or 1)))
+        
+        if self.SAVE_CAPTURES:
+            # The writer thread creates the folder and file; this loop only enqueues
+            self.recorder = SessionRecorder(os.path.join('captures', f"session_{int(time.time())}.fses"), meta={
+                'resolution': self.gui.resolution_var.get(),
+                'scale': self.ui_scale,
+                'goal': self.gui.goal_var.get(),
+                'region': self.gui.get_overlay_geometry(),
+                'coords': self.gui.get_overlay_coords(),
+            }).start()
+        
         # Force initial recommendation
         self.update_recommendation(force=True)
         
@@ -257,11 +342,13 @@ class BotController:
         try:
             region = self.gui.get_overlay_geometry()
             ocr_coords = self.gui.get_overlay_coords()['prob_ocr_box']
-            ocr_img = self.capture_ocr_clean(region, ocr_coords)
+            frame = self.capture_frame_clean(region, ocr_coords)
+            ocr_img = self.vision.get_ocr_view(frame, ocr_coords)
             
             current_res = self.gui.resolution_var.get()
             
-            label, conf = self.ocr.predict(ocr_img, resolution=current_res)
+            label = self.ocr.predict(ocr_img, resolution=current_res, scale=self.ui_scale).label
+            self.ocr_latency.record(time.perf_counter() - frame.requested_at)
             if label and label in ['2', '3', '4', '5', '6', '7']:
                 self.logic.set_probability_from_ocr(label)
                 self.gui.update_ocr_text(f"{int(self.logic.current_probability*100)}%")
@@ -280,26 +367,65 @@ class BotController:
                     'row3': [-1]*10
                 }
                 self.needs_reset = False
-                print("Loop State Reset")
+                slot_changes.reset()
+                log.info("Loop State Reset")
                 self.gui.update_ocr_text("") # Clear OCR text on reset
             
             try:
                 region = self.gui.get_overlay_geometry()
-                current_row_states = self.vision.analyze_state(region)
+                with self.spans.span("capture"):
+                    frame = self.vision.capture_frame(region)
+                previous_frame_time, last_frame_time = last_frame_time, frame.timestamp
+                with self.spans.span("analyze"):
+                    current_row_states = self.vision.analyze_frame_if_changed(frame, slot_changes)
+                if current_row_states is None:
+                    # Slot pixels identical to the last processed frame
+                    scheduler.wait()
+                    continue
+                scheduler.frame_changed()
                 
                 # Update Debug Circles (Always show what we see immediately)
-                self.gui.update_debug_circles(current_row_states)
+                with self.spans.span("gui"):
+                    self.gui.update_debug_circles(current_row_states)
                 
                 # Check for changes
                 if current_row_states != last_row_states:
-                    print("State Change Detected! Waiting for UI to settle...")
+                    log.info("State Change Detected! Waiting for UI to settle...")
+                    # The click happened after the last unchanged frame
+                    click_time = previous_frame_time or frame.timestamp
                     
                     # Hide recommendation during transition
                     self.gui.highlight_recommendation(None)
                     
-                    # Wait for 1-3 frames (approx 50ms) for text/animations to finish
-                    # User requested increase to 0.1s (1 frame of bot logic) for better stability
-                    time.sleep(0.1)
+                    # Wait until text/animations finish: N identical frames (slots + probability digit).
+                    # The settled frame serves both slot states and OCR; the votes only decide
+                    # between different digits when settling times out.
+                    ocr_coords = self.gui.get_overlay_coords()['prob_ocr_box']
+                    vote_res = self.gui.resolution_var.get()
+                    ocr_votes.clear()
+
+                    def _ocr_vote(f):
+                        # Cheap per frame: unchanged digits hit the OCR cache; the deque keeps the latest N
+                        try:
+                            with self.spans.span("predict"):
+                                ocr_votes.append(self.ocr.predict(self.vision.get_ocr_view(f, ocr_coords),
+                                                                  resolution=vote_res, scale=self.ui_scale))
+                        except Exception as e:
+                            log.warning("OCR Vote Error: %s", e)
+
+                    frame, settled = scheduler.wait_for_settle(
+                        lambda: self.capture_frame_clean(region, ocr_coords),
+                        lambda f: (self.vision.gather_patches(f.region_view()).tobytes(),
+                                   self.vision.get_ocr_view(f, ocr_coords).tobytes()),
+                        on_frame=_ocr_vote)
+                    if not settled:
+                        log.warning("UI did not settle in time, using the latest frame")
+                    with self.spans.span("analyze"):
+                        current_row_states = self.vision.analyze_frame(frame)
+                    slot_changes.remember(self.vision.gather_patches(frame.region_view()))
+                    self.gui.update_debug_circles(current_row_states)
+                    ocr_result = None
+                    expected_digit = None
                     
                     # Check for Auto Reset Condition (All slots became empty)
                     current_filled_count = sum(1 for row in current_row_states.values() for x in row if x != -1)
@@ -307,7 +433,7 @@ class BotController:
                     
                     if last_filled_count > 0 and current_filled_count == 0:
                         if self.gui.auto_reset_var.get():
-                            print("Auto Reset Triggered!")
+                            log.info("Auto Reset Triggered!")
                             self.reset_bot()
                             last_row_states = {
                                 'row1': [-1]*10,
@@ -327,29 +453,31 @@ class BotController:
                             if prev == -1 and curr != -1:
                                 # A slot was filled!
                                 is_success = (curr == 1)
-                                print(f"Slot Filled: {row}[{i}] = {'Success' if is_success else 'Fail'}")
+                                log.info("Slot Filled: %s[%d] = %s", row, i, "Success" if is_success else "Fail")
                                 
                                 # 1. Calculate Expected Probability (Game Rule)
                                 expected_prob = self.logic.calculate_next_probability(is_success)
                                 
                                 # OCR Probability Check
                                 try:
-                                    ocr_coords = self.gui.get_overlay_coords()['prob_ocr_box']
-                                    ocr_img = self.capture_ocr_clean(region, ocr_coords)
+                                    ocr_img = self.vision.get_ocr_view(frame, ocr_coords)
                                     
                                     current_res = self.gui.resolution_var.get()
                                     
-                                    # Save Capture if enabled
-                                    if self.SAVE_CAPTURES:
-                                        if not os.path.exists('captures'):
-                                            os.makedirs('captures')
-                                        timestamp = int(time.time() * 1000)
-                                        filename = f"captures/ocr_{timestamp}_{row}_{i}_{'succ' if is_success else 'fail'}.png"
-                                        cv2.imwrite(filename, ocr_img)
-                                        print(f"Saved capture: {filename}")
+                                    # What the game rule expects, the OCR label in the session log
+                                    expected_digit = str(int(round(expected_prob * 100)) // 10)
 
-                                    label, conf = self.ocr.predict(ocr_img, resolution=current_res)
-                                    print(f"OCR Prediction: {label} (Conf: {conf:.2f})")
+                                    # Same frame for every slot filled in this change
+                                    if ocr_result is None:
+                                        if not ocr_votes:
+                                            with self.spans.span("predict"):
+                                                ocr_votes.append(self.ocr.predict(ocr_img, resolution=current_res, scale=self.ui_scale))
+                                        ocr_result = self.ocr.vote(ocr_votes)
+                                        self.ocr_latency.record(time.perf_counter() - frame.requested_at)
+                                    label = ocr_result.label
+                                    log.info("OCR Prediction: %s", label, extra=fields(
+                                        score=round(ocr_result.score, 2), runner_up=ocr_result.second_label,
+                                        margin=round(ocr_result.margin, 2), frames=len(ocr_votes)))
                                     
                                     if label and label in ['2', '3', '4', '5', '6', '7']:
                                         # OCR Succeeded
@@ -358,7 +486,7 @@ class BotController:
                                         
                                         # Compare with Expected
                                         if abs(ocr_prob - expected_prob) > 0.01:
-                                            print(f"WARNING: Probability Mismatch! Expected {expected_prob}, OCR saw {ocr_prob}")
+                                            log.warning("Probability Mismatch! Expected %s, OCR saw %s", expected_prob, ocr_prob)
                                             box_color = 'yellow'
                                         else:
                                             box_color = '#00FF00' # Match -> Green
@@ -368,7 +496,7 @@ class BotController:
                                         self.gui.update_ocr_text(f"{int(self.logic.current_probability*100)}%")
                                     else:
                                         # OCR Failed (N or invalid)
-                                        print("OCR failed or invalid label. Using fallback logic.")
+                                        log.warning("OCR failed or invalid label. Using fallback logic.")
                                         self.gui.update_ocr_text("?") # Show ? on failure
                                         self.logic.update_probability(is_success)
                                         
@@ -376,7 +504,7 @@ class BotController:
                                         box_color = 'yellow'
                                         
                                 except Exception as e:
-                                    print(f"OCR Error: {e}")
+                                    log.error("OCR Error: %s", e)
                                     self.gui.update_ocr_text("?") # Show ? on error
                                     self.logic.update_probability(is_success)
                                     box_color = 'yellow' # Error -> Yellow
@@ -384,55 +512,115 @@ class BotController:
                     # Update Logic State
                     self.logic.slots = current_row_states
                     
-                    # Get New Recommendation
-                    move = self.logic.recommend_move()
-                    
-                    # Calculate Win Probability
-                    win_prob = self.logic.calculate_max_win_probability()
+                    with self.spans.span("recommend"):
+                        # Get New Recommendation
+                        move = self.logic.recommend_move()
+                        
+                        # Calculate Win Probability
+                        win_prob = self.logic.calculate_max_win_probability()
                     win_prob_pct = win_prob * 100
                     
                     # Update GUI
-                    self.gui.update_probability_text(f"Target Prob: {win_prob_pct:.2f}%")
-                    
+                    with self.spans.span("gui"):
+                        self.gui.update_probability_text(f"Target Prob: {win_prob_pct:.2f}%")
+                        self.request_outcome_update()
+                        
+                        if win_prob_pct <= 0.0:
+                            self.gui.highlight_recommendation(None) 
+                        else:
+                            self.gui.highlight_recommendation(move, color=box_color)
                     if win_prob_pct <= 0.0:
-                        self.gui.highlight_recommendation(None) 
-                        print(f"Win Prob is 0%. Stopping recommendation.")
+                        log.info("Win Prob is 0%. Stopping recommendation.")
                     else:
-                        self.gui.highlight_recommendation(move, color=box_color)
-                        print(f"New Prob: {int(self.logic.current_probability*100)}% -> Rec: {move} (Win: {win_prob_pct:.2f}%)")
+                        log.info("New Prob: %d%% -> Rec: %s (Win: %.2f%%)", int(self.logic.current_probability*100), move, win_prob_pct)
+                    scheduler.click_latency.record(time.perf_counter() - click_time)
+                    
+                    recorder = self.recorder
+                    if recorder is not None:
+                        recorder.record(current_row_states, roi=self.vision.get_ocr_view(frame, ocr_coords),
+                                        label=ocr_result.label if ocr_result else None,
+                                        score=ocr_result.score if ocr_result else 0.0,
+                                        expected=expected_digit, move=move, win=win_prob,
+                                        timestamp=time.time())
                     
                     last_row_states = current_row_states
             
             except Exception as e:
-                print(f"Error in loop: {e}")
+                log.error("Error in loop: %s", e)
+                # Re-analyze next tick even if the screen did not change
+                slot_changes.reset()
                 
-            time.sleep(0.1) # 0.1s Scan Interval
+            scheduler.wait()
+
+        log.info(slot_changes.format())
+        log.info(scheduler.format())
+        self.close_recorder()
+        
+        # Release this thread's capture session
+        self.vision.capture.close_thread()
+
+    def close_recorder(self):
+        """Flush the session log and stop its writer thread (no-op if not recording)."""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+            log.info(recorder.format())
+
+    def request_outcome_update(self):
+        """
+        Compute the final-result distribution for the current state in the
+        background and show it on the overlay when ready.
+        Requests superseded by a newer state are skipped.
+        """
+        state = self.logic.get_state_params()
+        self.outcome_request = state
+        
+        def _calc():
+            if self.outcome_request != state:
+                return
+            try:
+                dist = self.logic.calculate_outcome_distribution(state)
+            except Exception as e:
+                log.error("Outcome Distribution Error: %s", e)
+                return
+            if self.outcome_request != state:
+                return
+            
+            # Only count stones within the penalty limit
+            top = dist.get_top_classes(max_penalty=self.logic.target_r3_max)
+            text = "  ".join(f"{k}: {top.get(k, 0.0) * 100:.1f}%" for k in ['10x', '9x', '8x'])
+            self.gui.update_outcome_text(text)
+        
+        self.outcome_executor.submit(_calc)
 
     def update_recommendation(self, force=False):
         # Helper for initial run or reset
         try:
             region = self.gui.get_overlay_geometry()
+            ocr_coords = self.gui.get_overlay_coords()['prob_ocr_box']
+            frame = self.capture_frame_clean(region, ocr_coords)
             
             # 1. Analyze Slots
-            current_row_states = self.vision.analyze_state(region)
+            current_row_states = self.vision.analyze_frame(frame)
             self.logic.slots = current_row_states
             
             # 2. Check OCR (Sync Probability)
             try:
-                ocr_coords = self.gui.get_overlay_coords()['prob_ocr_box']
-                ocr_img = self.capture_ocr_clean(region, ocr_coords)
+                ocr_img = self.vision.get_ocr_view(frame, ocr_coords)
                 
                 # QHD Scaling: Removed in favor of native QHD templates
                 current_res = self.gui.resolution_var.get()
                 
-                label, conf = self.ocr.predict(ocr_img, resolution=current_res)
+                result = self.ocr.predict(ocr_img, resolution=current_res, scale=self.ui_scale)
+                self.ocr_latency.record(time.perf_counter() - frame.requested_at)
+                label = result.label
                 if label and label in ['2', '3', '4', '5', '6', '7']:
                     self.logic.set_probability_from_ocr(label)
                     self.gui.update_ocr_text(f"{int(self.logic.current_probability*100)}%")
                 else:
                     self.gui.update_ocr_text("?") # Indicate OCR failed/uncertain
             except Exception as e:
-                print(f"OCR Sync Error: {e}")
+                log.error("OCR Sync Error: %s", e)
             
             # 3. Get Recommendation
             move = self.logic.recommend_move()
@@ -442,13 +630,15 @@ class BotController:
             win_prob = self.logic.calculate_max_win_probability()
             win_prob_pct = win_prob * 100
             self.gui.update_probability_text(f"Target Prob: {win_prob_pct:.2f}%")
+            self.request_outcome_update()
             
             if force:
-                print(f"Synced State: Prob={int(self.logic.current_probability*100)}%, Win={win_prob_pct:.2f}% -> Rec: {move}")
+                log.info("Synced State: Prob=%d%%, Win=%.2f%% -> Rec: %s", int(self.logic.current_probability*100), win_prob_pct, move)
                 
         except Exception as e:
-            print(f"Update Recommendation Error: {e}")
+            log.error("Update Recommendation Error: %s", e)
 
 if __name__ == "__main__":
+    setup_logging()
     bot = BotController()
     bot.root.mainloop()
@@ -0,0 +1,215 @@
+"""
+Headless OCR evaluation and parameter tuning over labeled captures.
+
+Labels come from the folder name (<dir>/<label>/*.png, label 2-7 or N), from
+the _exp<digit> part of the file name, or, for SAVE_CAPTURES session logs
+(*.fses, see recorder.py), from each record's expected digit.
+
+    python ocr_eval.py captures --resolution FHD              # accuracy, confusion, latency
+    python ocr_eval.py captures --resolution QHD --tune -j 4  # grid search, writes tuned params
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark import timing_stats
+from ocr_subproject.new_ocr import NewOcrEngine
+from recorder import read_session_log
+
+LABELS = ['2', '3', '4', '5', '6', '7', 'N']
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_subproject")
+
+# Grid for --tune; n_pixel_thresh is relative to the engine's current value
+GRID = {
+    'thresh_block': [5, 7, 9, 11, 13, 15, 17, 19, 21],
+    'thresh_c': [0, 1, 2, 3, 4, 5, 6],
+    'n_pixel_scale': [0.6, 0.8, 1.0, 1.2, 1.4],
+    'match_thresh': [0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6],
+}
+
+
+def get_label(path):
+    parent = os.path.basename(os.path.dirname(path))
+    if parent in LABELS:
+        return parent
+    match = re.search(r"_exp([2-7N])(?:_|\.)", os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def load_session_rois(path):
+    """[(path#record, label, ROI)] for every record of a session log with an expected digit."""
+    _, records = read_session_log(path)
+    return [(f"{path}#{i}", r.expected, r.roi) for i, r in enumerate(records)
+            if r.expected in LABELS and r.roi is not None]
+
+
+def load_dataset(directory):
+    """[(path, label, BGR image)] for every labeled PNG or session log under directory."""
+    if os.path.isfile(directory):
+        return load_session_rois(directory)
+    dataset = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(".fses"):
+                dataset += load_session_rois(os.path.join(root, name))
+                continue
+            if not name.lower().endswith(".png"):
+                continue
+            path = os.path.join(root, name)
+            label = get_label(path)
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if label is None or img is None:
+                continue
+            dataset.append((path, label, img))
+    return dataset
+
+
+def evaluate(engine, dataset, resolution, scale=1.0):
+    """Accuracy, confusion matrix (true -> predicted counts), latency and misses."""
+    confusion = {t: {p: 0 for p in LABELS} for t in LABELS}
+    latencies = []
+    misses = []
+    correct = 0
+    for path, label, img in dataset:
+        start = time.perf_counter()
+        result = engine.predict(img, resolution, scale)
+        predicted, score = result.label, result.score
+        latencies.append(time.perf_counter() - start)
+        predicted = predicted if predicted in LABELS else 'N'
+        confusion[label][predicted] += 1
+        if predicted == label:
+            correct += 1
+        else:
+            misses.append({"path": path, "label": label, "predicted": predicted, "score": score,
+                           "second": result.second_label, "margin": result.margin})
+    return {
+        "images": len(dataset),
+        "accuracy": correct / len(dataset) if dataset else 0.0,
+        "confusion": confusion,
+        "latency": timing_stats(latencies) if latencies else None,
+        "misses": misses,
+    }
+
+
+_dataset = None
+
+
+def _init_worker(directory):
+    # Each worker reads the captures once
+    global _dataset
+    _dataset = load_dataset(directory)
+
+
+def _eval_thresholds(args):
+    # Templates depend on (block, c) only, so build one engine per pair
+    # and sweep n_pixel_thresh/match_thresh on it
+    resolution, scale, block, c, n_pixel_values, match_values = args
+    dataset = _dataset
+    engine = NewOcrEngine(BASE_DIR, cache_size=0, params_file=None,
+                          params={resolution: {'thresh_block': block, 'thresh_c': c}})
+    results = []
+    for n_pixel, match in itertools.product(n_pixel_values, match_values):
+        engine.set_params(resolution, {'n_pixel_thresh': n_pixel, 'match_thresh': match})
+        correct = sum(engine.predict(img, resolution, scale).label == label for _, label, img in dataset)
+        params = {'thresh_block': block, 'thresh_c': c, 'n_pixel_thresh': n_pixel, 'match_thresh': match}
+        results.append((correct / len(dataset), params))
+    return results
+
+
+def tune(directory, resolution, scale=1.0, workers=1):
+    """Grid search over the tunable params. Returns (best accuracy, best params, current params)."""
+    current = dict(NewOcrEngine(BASE_DIR, cache_size=0).params[resolution])
+    n_pixel_values = sorted({int(round(current['n_pixel_thresh'] * s)) for s in GRID['n_pixel_scale']})
+    jobs = [(resolution, scale, block, c, n_pixel_values, GRID['match_thresh'])
+            for block, c in itertools.product(GRID['thresh_block'], GRID['thresh_c'])]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as pool:
+            results = [r for chunk in pool.map(_eval_thresholds, jobs) for r in chunk]
+    else:
+        _init_worker(directory)
+        results = [r for job in jobs for r in _eval_thresholds(job)]
+
+    # Best accuracy; on ties keep the current params
+    def _key(result):
+        accuracy, params = result
+        return (accuracy, all(current[k] == v for k, v in params.items()))
+
+    best_accuracy, best_params = max(results, key=_key)
+    return best_accuracy, best_params, current
+
+
+def write_params(path, resolution, params, accuracy, images):
+    """Merge params for one resolution into the tuned params file."""
+    data = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+    data.setdefault("params", {})[resolution] = params
+    data.setdefault("meta", {})[resolution] = {
+        "accuracy": accuracy,
+        "images": images,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def print_report(report):
+    print(f"{report['images']} images, accuracy {report['accuracy'] * 100:.1f}%")
+    print("true\\pred " + " ".join(f"{p:>4s}" for p in LABELS))
+    for t in LABELS:
+        row = report['confusion'][t]
+        if sum(row.values()):
+            print(f"{t:9s} " + " ".join(f"{row[p]:4d}" for p in LABELS))
+    if report['latency']:
+        lat = report['latency']
+        print(f"latency median {lat['median'] * 1e6:.0f} us, max {lat['max'] * 1e6:.0f} us")
+    for miss in report['misses'][:20]:
+        print(f"  miss {miss['path']}: {miss['label']} -> {miss['predicted']} ({miss['score']:.2f}, "
+              f"runner-up {miss['second']} margin {miss['margin']:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="folder of labeled captures, or one session log")
+    parser.add_argument("--resolution", default="FHD", choices=["FHD", "QHD"])
+    parser.add_argument("--scale", type=float, default=1.0, help="UI scale the captures were taken at")
+    parser.add_argument("--tune", action="store_true", help="grid-search params and write the best ones")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-o", "--output", default=os.path.join(BASE_DIR, NewOcrEngine.PARAMS_FILE),
+                        help="tuned params file (default: the one the engine loads)")
+    parser.add_argument("--json", help="also write the evaluation report to this file")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.directory)
+    if not dataset:
+        print(f"No labeled captures found in {args.directory}")
+        sys.exit(1)
+
+    engine = NewOcrEngine(BASE_DIR, cache_size=0)
+    report = evaluate(engine, dataset, args.resolution, args.scale)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.tune:
+        start = time.perf_counter()
+        accuracy, params, current = tune(args.directory, args.resolution, args.scale, args.workers)
+        print(f"Grid search took {time.perf_counter() - start:.1f}s")
+        print(f"Current: {report['accuracy'] * 100:.1f}% "
+              f"{ {k: current[k] for k in NewOcrEngine.TUNABLE_PARAMS} }")
+        print(f"Best:    {accuracy * 100:.1f}% {params}")
+        write_params(args.output, args.resolution, params, accuracy, len(dataset))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
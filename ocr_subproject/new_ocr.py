@@ -2,10 +2,196 @@ import cv2
 import numpy as np
 import sys
 import os
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
 from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Plain stdlib logger so the subproject stays standalone; main.py's
+# logger.setup_logging() routes it through the queue like everything else
+log = logging.getLogger(__name__)
+
+class OcrResult(NamedTuple):
+    """
+    label: '2'-'7', 'N' (no digit) or None (unknown resolution).
+    second_label / margin: runner-up template and the score gap to it.
+    A blank ROI is 'N' with margin 1.0; a digit below match_thresh is 'N'
+    with the closest template as second_label and margin 0.0.
+    """
+    label: Optional[str]
+    score: float
+    second_label: Optional[str] = None
+    margin: float = 0.0
+
+
+class TemplateStack:
+    """
+    All templates of one resolution zero-padded into a single (K, Hmax*Wmax)
+    matrix, so one matmul over every sliding window scores all templates at
+    once. Scores follow cv2.TM_CCOEFF_NORMED, including its rule for flat
+    windows (|num| < t: num/t, |num| < 1.125t: +-1, else 0).
+    """
+    def __init__(self, templates):
+        self.labels = [label for label, _ in templates]
+        self.sizes = np.array([t.shape for _, t in templates])
+        self.h_max, self.w_max = self.sizes.max(axis=0)
+        self.h_min, self.w_min = self.sizes.min(axis=0)
+
+        k = len(templates)
+        padded = np.zeros((k, self.h_max, self.w_max))
+        mask = np.zeros((k, self.h_max, self.w_max))
+        for i, (_, t) in enumerate(templates):
+            padded[i, :t.shape[0], :t.shape[1]] = t
+            mask[i, :t.shape[0], :t.shape[1]] = 1
+        self.mask = mask.reshape(k, -1).T
+        # [templates | masks]: one matmul gives the correlation and the window sums
+        self.templ_and_mask = np.hstack([padded.reshape(k, -1).T, self.mask])
+
+        # Per template: area, sum and area * centered sum of squares (all exact in float64)
+        self.area = self.sizes.prod(axis=1).astype(np.float64)
+        self.templ_sum = padded.sum(axis=(1, 2))
+        self.templ_norm2 = self.area * (padded ** 2).sum(axis=(1, 2)) - self.templ_sum ** 2
+        self._layouts = {}
+
+    def get_layout(self, shape):
+        """
+        Per input shape: zero-padded input buffer, flat indices of every
+        window (n_offsets, Hmax*Wmax) and the (n_offsets, K) mask of offsets
+        where each template fits inside the input.
+        """
+        if shape not in self._layouts:
+            h, w = shape
+            n_y, n_x = h - self.h_min + 1, w - self.w_min + 1
+            # Pad so the largest template's window exists at every offset
+            buf = np.zeros((h + self.h_max - self.h_min, w + self.w_max - self.w_min))
+            oy, ox = np.meshgrid(np.arange(n_y), np.arange(n_x), indexing='ij')
+            dy, dx = np.meshgrid(np.arange(self.h_max), np.arange(self.w_max), indexing='ij')
+            index = ((oy.reshape(-1, 1) + dy.reshape(1, -1)) * buf.shape[1] +
+                     ox.reshape(-1, 1) + dx.reshape(1, -1))
+            valid = ((oy.reshape(-1, 1) <= h - self.sizes[:, 0]) &
+                     (ox.reshape(-1, 1) <= w - self.sizes[:, 1]))
+            self._layouts[shape] = (buf, index, valid)
+        return self._layouts[shape]
+
+    def match(self, image):
+        """Best TM_CCOEFF_NORMED score of every template over all offsets, shape (K,)."""
+        h, w = image.shape
+        buf, index, valid = self.get_layout((h, w))
+        buf[:h, :w] = image
+        windows = buf.take(index)
+
+        k = len(self.labels)
+        sums = windows @ self.templ_and_mask
+        corr, wnd_sum = sums[:, :k], sums[:, k:]
+        wnd_sum2 = (windows * windows) @ self.mask
+
+        # Everything scaled by area so num and t stay integer until the sqrt
+        num = self.area * corr - wnd_sum * self.templ_sum
+        t = np.sqrt(np.maximum(self.area * wnd_sum2 - wnd_sum * wnd_sum, 0) * self.templ_norm2)
+        inside = np.abs(num) < t
+        scores = np.divide(num, t, out=np.zeros_like(num), where=inside)
+        edge = ~inside & (np.abs(num) < t * 1.125)
+        if edge.any():
+            scores[edge] = np.sign(num[edge])
+        # Constant template: OpenCV returns 1 everywhere
+        scores[:, self.templ_norm2 == 0] = 1.0
+
+        scores[~valid] = -np.inf
+        # cv2 returns float32 results
+        return scores.max(axis=0).astype(np.float32).astype(np.float64)
+
+
+class TemplateBank:
+    """
+    Template stacks per (resolution, UI scale bucket, ROI shape). Buckets
+    other than 1.0 are built on first use (or by prewarm) by resizing the raw
+    *_best.png images before thresholding, and kept for reuse. Templates
+    larger than the ROI are center-cropped to it, so a stack always matches
+    the OCR box it is used on.
+    """
+    SCALE_STEP = 0.05
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.stacks = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def bucket(self, scale):
+        return round(round(scale / self.SCALE_STEP) * self.SCALE_STEP, 2)
+
+    def get(self, resolution, scale, roi_shape):
+        key = (resolution, self.bucket(scale), tuple(roi_shape[:2]))
+        stack = self.stacks.get(key)
+        if stack is not None:
+            return stack
+        
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # One builder per bucket; prewarm and predict never build it twice
+        with key_lock:
+            if key not in self.stacks:
+                self.stacks[key] = self.build(*key)
+        return self.stacks[key]
+
+    def build(self, resolution, bucket, roi_shape):
+        raw = self.engine.raw_templates.get(resolution)
+        if not raw:
+            return None
+        p = self.engine.params[resolution]
+        max_h, max_w = roi_shape
+        interpolation = cv2.INTER_AREA if bucket < 1.0 else cv2.INTER_LINEAR
+        
+        templates = []
+        cropped = False
+        for label, img in raw:
+            scaled = img if bucket == 1.0 else cv2.resize(img, None, fx=bucket, fy=bucket, interpolation=interpolation)
+            template = self.engine.prepare_template(scaled, p)
+            # Center-crop anything the OCR box could never contain
+            h, w = template.shape
+            if h > max_h:
+                template = template[(h - max_h) // 2:(h - max_h) // 2 + max_h]
+            if w > max_w:
+                template = template[:, (w - max_w) // 2:(w - max_w) // 2 + max_w]
+            cropped |= template.shape != (h, w)
+            templates.append((label, template))
+        if bucket == 1.0 and not cropped:
+            # Same templates as the engine's native stack
+            return self.engine.template_stacks[resolution]
+        if cropped:
+            log.warning("%s templates at UI scale %.2f cropped to the %dx%d OCR box",
+                        resolution, bucket, max_w, max_h)
+        log.info("Built %s templates for UI scale %.2f", resolution, bucket)
+        return TemplateStack(templates)
+
+    def prewarm(self, resolution, scale, roi_shape):
+        """Build the stack for this scale and ROI (h, w) on a background thread (no-op if built)."""
+        if (resolution, self.bucket(scale), tuple(roi_shape[:2])) in self.stacks:
+            return None
+        
+        def _run():
+            try:
+                self.get(resolution, scale, roi_shape)
+            except Exception as e:
+                log.error("Template prewarm error (%s, %s): %s", resolution, scale, e)
+        
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+
 
 class NewOcrEngine:
-    def __init__(self, base_dir='ocr_subproject'):
+    # Written by ocr_eval.py --tune, loaded from base_dir at startup if present
+    PARAMS_FILE = 'tuned_params.json'
+    TUNABLE_PARAMS = ('thresh_block', 'thresh_c', 'n_pixel_thresh', 'match_thresh')
+
+    def __init__(self, base_dir='ocr_subproject', cache_size=256, params_file=PARAMS_FILE, params=None):
+        """
+        params_file: tuned parameters relative to base_dir (None to skip).
+        params: {resolution: {name: value}} applied on top, e.g. by the tuning harness.
+        """
         if getattr(sys, 'frozen', False):
             # Running as compiled executable
             base_path = Path(sys._MEIPASS)
@@ -15,6 +201,18 @@ class NewOcrEngine:
             self.base_dir = Path(base_dir)
             
         self.templates = {'FHD': [], 'QHD': []}
+        self.raw_templates = {'FHD': [], 'QHD': []}
+        # Native (scale 1.0) stacks; other UI scales come from self.bank
+        self.template_stacks = {}
+        
+        # LRU of results keyed by (resolution, thresholded ROI); 0 disables it.
+        # The digit only changes when a slot fills, so most calls are repeats.
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Guards the cache and the template stacks' shared buffers
+        self._lock = threading.Lock()
         
         # Hyperparameters per Resolution
         self.params = {
@@ -34,7 +232,33 @@ class NewOcrEngine:
             }
         }
         
+        if params_file:
+            self.load_params(self.base_dir / params_file)
+        for resolution, values in (params or {}).items():
+            self.set_params(resolution, values)
+        
         self.load_templates()
+        self.bank = TemplateBank(self)
+        
+    def set_params(self, resolution, values):
+        if resolution not in self.params:
+            return
+        for key in self.TUNABLE_PARAMS:
+            if key in values:
+                self.params[resolution][key] = values[key]
+
+    def load_params(self, path):
+        """Apply tuned params from a JSON file ({resolution: {name: value}})."""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            for resolution, values in data.get('params', {}).items():
+                self.set_params(resolution, values)
+            log.info("Loaded tuned OCR params from %s", path)
+        except Exception as e:
+            log.error("Error loading OCR params: %s", e)
         
     def load_templates(self):
         for resolution in ['FHD', 'QHD']:
@@ -49,27 +273,30 @@ class NewOcrEngine:
                 best_img_path = res_path / f"{label}_best.png"
                 
                 if not best_img_path.exists():
-                    print(f"Warning: Best template not found for {resolution}/{label}")
+                    log.warning("Best template not found for %s/%s", resolution, label)
                     continue
                     
                 img = cv2.imread(str(best_img_path), cv2.IMREAD_GRAYSCALE)
                 if img is None: continue
                 
                 # Use Template AS IS (User manually cropped)
-                # Just threshold it
-                thresh = self.apply_threshold(img, p)
-                
-                # CROP 1px from all sides (User Request)
-                # This allows the template to "slide" more within the input image
-                h, w = thresh.shape
-                if h > 2 and w > 2:
-                    cropped = thresh[1:h-1, 1:w-1]
-                else:
-                    cropped = thresh
-                
-                self.templates[resolution].append((label, cropped))
+                self.raw_templates[resolution].append((label, img))
+                self.templates[resolution].append((label, self.prepare_template(img, p)))
             
-            print(f"Loaded {len(self.templates[resolution])} best templates for {resolution}")
+            if self.templates[resolution]:
+                self.template_stacks[resolution] = TemplateStack(self.templates[resolution])
+            log.info("Loaded %d best templates for %s", len(self.templates[resolution]), resolution)
+
+    def prepare_template(self, img, params):
+        # Just threshold it
+        thresh = self.apply_threshold(img, params)
+        
+        # CROP 1px from all sides (User Request)
+        # This allows the template to "slide" more within the input image
+        h, w = thresh.shape
+        if h > 2 and w > 2:
+            return thresh[1:h-1, 1:w-1]
+        return thresh
 
     def apply_threshold(self, img, params):
         return cv2.adaptiveThreshold(
@@ -78,7 +305,10 @@ class NewOcrEngine:
         )
 
     def preprocess_input(self, image, resolution):
-        if len(image.shape) == 3:
+        if len(image.shape) == 3 and image.shape[2] == 4:
+            # BGRA view straight out of a captured frame
+            gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+        elif len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         else:
             gray = image
@@ -93,7 +323,109 @@ class NewOcrEngine:
         
         return thresh
 
-    def predict(self, image, resolution='FHD'):
+    def predict(self, image, resolution='FHD', scale=1.0):
+        """OcrResult for the digit in image; scale is the overlay's UI scale."""
+        if resolution not in self.templates:
+            return OcrResult(None, 0.0)
+            
+        processed_input = self.preprocess_input(image, resolution)
+        bucket = self.bank.bucket(scale)
+        if self.cache_size <= 0:
+            with self._lock:
+                return self.classify(processed_input, resolution, bucket)
+        
+        # Raw bytes + shape as key: hashing ~300 bytes is cheap and cannot collide
+        key = (resolution, bucket, processed_input.shape, processed_input.tobytes())
+        with self._lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+                return result
+            
+            self.cache_misses += 1
+            result = self.classify(processed_input, resolution, bucket)
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def cache_stats(self):
+        total = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / total if total else 0.0,
+            "size": len(self.cache),
+        }
+
+    def clear_cache(self):
+        with self._lock:
+            self.cache.clear()
+
+    def classify(self, processed_input, resolution, scale=1.0):
+        """OcrResult of an already thresholded ROI."""
+        p = self.params[resolution]
+        
+        # 1. Fast N Check (Pixel Count); digit area grows with scale^2
+        non_zero = cv2.countNonZero(processed_input)
+        if non_zero < p['n_pixel_thresh'] * scale * scale:
+            return OcrResult('N', 1.0, None, 1.0)
+        
+        stack = self.bank.get(resolution, scale, processed_input.shape)
+        if stack is None:
+            return OcrResult('N', 0.0)
+        
+        # 2. All templates in one batched match; first best template wins (as in the loop)
+        scores = stack.match(processed_input)
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        if best_score <= 0.0:
+            return OcrResult('N', 0.0, stack.labels[best])
+        
+        if best_score < p['match_thresh']:
+            return OcrResult('N', best_score, stack.labels[best])
+        
+        second_label, second_score = None, 0.0
+        if len(scores) > 1:
+            rest = scores.copy()
+            rest[best] = -np.inf
+            second = int(np.argmax(rest))
+            second_label, second_score = stack.labels[second], max(float(rest[second]), 0.0)
+        return OcrResult(stack.labels[best], best_score, second_label, best_score - second_score)
+
+    @staticmethod
+    def vote(results):
+        """
+        Combine OcrResults of consecutive frames, oldest first. The label
+        with the most votes wins; ties go to the label seen most recently,
+        and 'N' never beats a digit. Its score is the vote share times its
+        mean score, and margin is the vote-share lead over the runner-up.
+        """
+        results = [r for r in results if r.label is not None]
+        if not results:
+            return OcrResult('N', 0.0)
+        
+        votes = Counter()
+        scores = Counter()
+        last_seen = {}
+        for i, r in enumerate(results):
+            votes[r.label] += 1
+            scores[r.label] += r.score
+            last_seen[r.label] = i
+        ranked = sorted(votes, key=lambda label: (label != 'N', votes[label], last_seen[label]), reverse=True)
+        
+        winner = ranked[0]
+        share = votes[winner] / len(results)
+        confidence = share * scores[winner] / votes[winner]
+        if len(ranked) > 1:
+            runner_up = ranked[1]
+            return OcrResult(winner, confidence, runner_up, share - votes[runner_up] / len(results))
+        # Unanimous: runner-up is the frames' own runner-up template
+        return OcrResult(winner, confidence, results[-1].second_label, share)
+
+    def predict_reference(self, image, resolution='FHD'):
+        """Original per-template cv2.matchTemplate loop, kept to check predict() against."""
         if resolution not in self.templates:
             return None, 0.0
             
@@ -121,3 +453,69 @@ class NewOcrEngine:
             return 'N', best_score
             
         return best_label, best_score
+
+
+def sample_inputs(engine, resolution, box, count=20, seed=0):
+    """
+    Test ROIs for a resolution: each bundled *_best.png as is, pasted at
+    random offsets into gray backgrounds of the OCR box size (h, w), plus
+    pure noise (-> 'N').
+    """
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for label in ['2', '3', '4', '5', '6', '7']:
+        img = cv2.imread(str(engine.base_dir / resolution / f"{label}_best.png"), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            continue
+        inputs.append(img)
+        h, w = min(img.shape[0], box[0]), min(img.shape[1], box[1])
+        for _ in range(count):
+            roi = rng.integers(60, 200) + rng.integers(0, 20, size=box)
+            y = rng.integers(0, box[0] - h + 1)
+            x = rng.integers(0, box[1] - w + 1)
+            roi[y:y + h, x:x + w] = img[:h, :w]
+            inputs.append(roi.astype(np.uint8))
+    inputs += [rng.integers(0, 256, size=box, dtype=np.uint8) for _ in range(count)]
+    return inputs
+
+
+if __name__ == "__main__":
+    # predict() must agree with the per-template cv2 loop:
+    #   python ocr_subproject/new_ocr.py   (from the repo root)
+    # OCR box sizes come from the overlay (overlay_geometry.py in the repo root)
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from overlay_geometry import ocr_box_size
+    
+    engine = NewOcrEngine()
+    total = mismatches = 0
+    max_diff = 0.0
+    for resolution in engine.template_stacks:
+        for img in sample_inputs(engine, resolution, ocr_box_size(resolution)):
+            label, score, _, _ = engine.predict(img, resolution)
+            ref_label, ref_score = engine.predict_reference(img, resolution)
+            total += 1
+            # cv2 computes the correlation in float32 via DFT: scores agree to ~1e-6
+            if label != ref_label or abs(score - ref_score) > 1e-5:
+                mismatches += 1
+                print(f"Mismatch {resolution}: {label} {score:.6f} vs {ref_label} {ref_score:.6f}")
+            max_diff = max(max_diff, abs(score - ref_score))
+    print(f"{total} images, {mismatches} mismatches, max score difference {max_diff:.2e}")
+    
+    # vote(): majority, recency only between equal counts, 'N' never beats a digit
+    vote_cases = [
+        (['5', '3', '3'], '3'),  # stale digit in the first frame
+        (['3', '5', '3'], '3'),  # one misread frame
+        (['3', '3', '5'], '3'),  # misread last frame
+        (['3', '3', 'N'], '3'),  # blank last frame
+        (['N', 'N', '4'], '4'),
+        (['3', '5'], '5'),       # tie: newest
+        (['3', '3', '3'], '3'),
+        (['N', 'N'], 'N'),
+    ]
+    for labels, expected in vote_cases:
+        voted = NewOcrEngine.vote([OcrResult(label, 0.9) for label in labels]).label
+        if voted != expected:
+            mismatches += 1
+            print(f"Vote mismatch: {labels} -> {voted}, expected {expected}")
+    print(f"{len(vote_cases)} vote cases checked")
+    sys.exit(1 if mismatches else 0)
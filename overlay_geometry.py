@@ -0,0 +1,77 @@
+"""
+Overlay geometry per resolution: slot rows, click button and OCR box
+positions relative to the overlay window. Shared by the overlay
+(overlay_gui.py) and the headless tools, which have no tkinter.
+"""
+LAYOUTS = {
+    'FHD': {
+        'spacing_x': 38,
+        'row1_to_row2': 92,
+        'row2_to_row3': 128,
+        'last_slot_to_button': 95,
+        'button_size': 30
+    },
+    'QHD': {
+        'spacing_x': 50.5,
+        'row1_to_row2': 123,
+        'row2_to_row3': 171,
+        'last_slot_to_button': 127,
+        'button_size': 40
+    }
+}
+
+# OCR box at 100% scale: (x offset from button_x, y offset from row1_y, width, height).
+# Offsets and size both scale with the UI, like the digit the game draws in it
+# (the OCR templates are rescaled to match, see TemplateBank in new_ocr.py).
+OCR_BOXES = {
+    'FHD': (5, -68, 14, 18),
+    'QHD': (10, -92, 16, 24),
+}
+
+ANCHOR_X = 30
+ANCHOR_Y = 120 # Fits the QHD OCR box (row1_y - 92)
+
+SLOTS_PER_ROW = 10
+
+
+def ocr_box_size(resolution, scale=1.0):
+    """(height, width) of the OCR box at this UI scale."""
+    _, _, w, h = OCR_BOXES[resolution]
+    return int(round(h * scale)), int(round(w * scale))
+
+
+def overlay_coords(resolution='FHD', scale=1.0, anchor_x=ANCHOR_X, anchor_y=ANCHOR_Y):
+    """Slot rows, button and OCR box coords inside the overlay window."""
+    cfg = LAYOUTS[resolution]
+    r1r2 = cfg['row1_to_row2'] * scale
+    r2r3 = cfg['row2_to_row3'] * scale
+    coords = {
+        'row1_y': int(anchor_y),
+        'row2_y': int(anchor_y + r1r2),
+        'row3_y': int(anchor_y + r1r2 + r2r3),
+        'start_x': int(anchor_x),
+        'spacing_x': cfg['spacing_x'] * scale,
+        'button_x': int((anchor_x + (SLOTS_PER_ROW - 1) * (cfg['spacing_x'] * scale)) +
+                        (cfg['last_slot_to_button'] * scale)),
+    }
+
+    off_x, off_y, _, _ = OCR_BOXES[resolution]
+    h, w = ocr_box_size(resolution, scale)
+    x1 = int(coords['button_x'] + off_x * scale)
+    y1 = int(coords['row1_y'] + off_y * scale)
+    coords['prob_ocr_box'] = {
+        'x1': x1,
+        'y1': y1,
+        'x2': x1 + w,
+        'y2': y1 + h
+    }
+    return coords
+
+
+def overlay_size(resolution='FHD', scale=1.0, anchor_x=ANCHOR_X, anchor_y=ANCHOR_Y):
+    """(width, height) of the overlay window: slots, button and padding."""
+    cfg = LAYOUTS[resolution]
+    width = (anchor_x + (SLOTS_PER_ROW - 1) * cfg['spacing_x'] * scale +
+             cfg['last_slot_to_button'] * scale + cfg['button_size'] * scale + 30)
+    height = anchor_y + cfg['row1_to_row2'] * scale + cfg['row2_to_row3'] * scale + 50
+    return int(width), int(height)
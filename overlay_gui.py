@@ -1,7 +1,15 @@
 import tkinter as tk
 from ctypes import windll
+import overlay_geometry
+from logger import get_logger, setup_logging
+
+log = get_logger(__name__)
 
 class VisualOverlay(tk.Toplevel):
+    OCR_BOX_MODES = ('outside', 'hide')
+    # Outline width is 2 (1px each side of the line), so 3px keeps it clear of the box
+    OCR_BOX_MARGIN = 3
+
     def __init__(self, master):
         super().__init__(master)
         self.title("Visual Guide (Align This)")
@@ -14,42 +22,37 @@ class VisualOverlay(tk.Toplevel):
         self.canvas = tk.Canvas(self, width=600, height=400, bg='white', highlightthickness=0)
         self.canvas.pack(fill='both', expand=True)
         
-        # Configurations
-        self.configs = {
-            'FHD': {
-                'spacing_x': 38,
-                'row1_to_row2': 92,
-                'row2_to_row3': 128,
-                'last_slot_to_button': 95,
-                'button_size': 30
-            },
-            'QHD': {
-                'spacing_x': 50.5,
-                'row1_to_row2': 123,
-                'row2_to_row3': 171,
-                'last_slot_to_button': 127,
-                'button_size': 40
-            }
-        }
-        
         self.current_res = 'FHD'
         self.scale_factor = 1.0 # Default Scale
+        # 'outside': OCR box outline drawn around (not on) the captured pixels
+        # 'hide': legacy, outline on the box edge, hidden for every OCR capture
+        self.ocr_box_mode = 'outside'
         
         # Tighter margins
-        self.anchor_x = 30 
-        self.anchor_y = 120 # Increased from 80 to 120 to fit QHD OCR box (row1_y - 92)
+        self.anchor_x = overlay_geometry.ANCHOR_X
+        self.anchor_y = overlay_geometry.ANCHOR_Y
+        
+        # Slot/highlight items are created once per draw_guides and only reconfigured;
+        # counts of item updates done vs skipped because nothing changed
+        self.redraws = 0
+        self.redraws_avoided = 0
         
         self.update_coords()
         self.update_window_size()
         self.draw_guides()
         
     def set_resolution(self, res):
-        if res in self.configs:
+        if res in overlay_geometry.LAYOUTS:
             self.current_res = res
             self.update_coords()
             self.update_window_size()
             self.draw_guides()
 
+    def set_ocr_box_mode(self, mode):
+        if mode in self.OCR_BOX_MODES:
+            self.ocr_box_mode = mode
+            self.draw_guides()
+
     def set_scale(self, factor):
         self.scale_factor = factor
         self.update_coords()
@@ -57,71 +60,15 @@ class VisualOverlay(tk.Toplevel):
         self.draw_guides()
 
     def update_window_size(self):
-        cfg = self.configs[self.current_res]
-        # Calculate required width/height
-        # Width: anchor_x + (9 * spacing) + last_to_btn + btn_size + padding
-        # Width: anchor_x + (9 * spacing) + last_to_btn + btn_size + padding
-        # Apply scaling to intervals
-        s_spacing = cfg['spacing_x'] * self.scale_factor
-        s_last = cfg['last_slot_to_button'] * self.scale_factor
-        s_btn = cfg['button_size'] * self.scale_factor
-        
-        total_width = self.anchor_x + (9 * s_spacing) + s_last + s_btn + 30
-        # Height: anchor_y + row1_to_row2 + row2_to_row3 + padding
-        s_r1r2 = cfg['row1_to_row2'] * self.scale_factor
-        s_r2r3 = cfg['row2_to_row3'] * self.scale_factor
-        
-        total_height = self.anchor_y + s_r1r2 + s_r2r3 + 50
-        
-        self.geometry(f"{int(total_width)}x{int(total_height)}")
-        self.canvas.config(width=int(total_width), height=int(total_height))
+        total_width, total_height = overlay_geometry.overlay_size(self.current_res, self.scale_factor,
+                                                                  self.anchor_x, self.anchor_y)
+        self.geometry(f"{total_width}x{total_height}")
+        self.canvas.config(width=total_width, height=total_height)
 
     def update_coords(self):
-        cfg = self.configs[self.current_res]
-        sf = self.scale_factor
-        
-        # Apply scaling to vertical offsets
-        r1r2 = cfg['row1_to_row2'] * sf
-        r2r3 = cfg['row2_to_row3'] * sf
-        
-        self.coords = {
-            'row1_y': int(self.anchor_y),
-            'row2_y': int(self.anchor_y + r1r2),
-            'row3_y': int(self.anchor_y + r1r2 + r2r3),
-            'start_x': int(self.anchor_x),
-            'spacing_x': cfg['spacing_x'] * sf, 
-            'button_x': int((self.anchor_x + 9 * (cfg['spacing_x'] * sf)) + (cfg['last_slot_to_button'] * sf)),
-        }
-        
-        # Add OCR Box coords (Centered on button, 50-70px above row1)
-        # User requested: "Size is 100% maintained, position changes accordingly"
-        # So we scale the Position Offsets, but keep Width/Height fixed.
-        
-        if self.current_res == 'QHD':
-            # QHD Fixed Sizes (100% Scale)
-            w = 16
-            h = 24
-            # Base Offsets (at scale 1.0)
-            off_x = 10
-            off_y = -92
-        else:
-            # FHD Fixed Sizes (100% Scale)
-            w = 14
-            h = 18
-            # Base Offsets (at scale 1.0)
-            off_x = 5
-            off_y = -68
-            
-        # Apply Scale to Position Offsets
-        s_off_x = off_x * sf
-        s_off_y = off_y * sf
-        
-        self.coords['prob_ocr_box'] = {
-            'x1': int(self.coords['button_x'] + s_off_x),
-            'y1': int(self.coords['row1_y'] + s_off_y),
-            'x2': int(self.coords['button_x'] + s_off_x + w), # Fixed Width
-            'y2': int(self.coords['row1_y'] + s_off_y + h)  # Fixed Height
-        }
+        # Slot rows, button and OCR box (overlay_geometry.py), all scaled with the UI
+        self.coords = overlay_geometry.overlay_coords(self.current_res, self.scale_factor,
+                                                      self.anchor_x, self.anchor_y)
 
     def draw_guides(self):
         self.canvas.delete('guide')
@@ -140,7 +87,8 @@ class VisualOverlay(tk.Toplevel):
             
         # Draw OCR Box
         ocr = self.coords['prob_ocr_box']
-        self.canvas.create_rectangle(ocr['x1'], ocr['y1'], ocr['x2'], ocr['y2'], 
+        m = self.OCR_BOX_MARGIN if self.ocr_box_mode == 'outside' else 0
+        self.canvas.create_rectangle(ocr['x1'] - m, ocr['y1'] - m, ocr['x2'] + m, ocr['y2'] + m, 
                                    outline='orange', width=2, tags=('guide', 'ocr_box'))
         # Win Probability Text
         # Aligned with OCR text (Y) and First Slot (X)
@@ -155,6 +103,17 @@ class VisualOverlay(tk.Toplevel):
             tags='guide'
         )
 
+        # Outcome Distribution Text (below Win Probability)
+        self.outcome_text_id = self.canvas.create_text(
+            self.coords['start_x'], 
+            ocr_center_y + 18 * self.scale_factor, 
+            text="", 
+            fill='purple', 
+            font=('Arial', 9), 
+            anchor='w',
+            tags='guide'
+        )
+
         # OCR Result Text (Left of OCR Box)
         # User requested: FHD 67px left, QHD 100px left
         # We scale this offset too so it maintains relative distance
@@ -170,6 +129,53 @@ class VisualOverlay(tk.Toplevel):
             anchor='e',
             tags='guide'
         )
+        
+        self.create_item_pools()
+
+    def create_item_pools(self):
+        """
+        Hidden items for the 30 slot circles and 3 row highlights, at the
+        current coords. update_debug_circles / highlight_recommendation only
+        itemconfigure them.
+        """
+        previous_slots = getattr(self, 'slot_states', {})
+        previous_highlights = getattr(self, 'highlight_colors', {})
+        self.canvas.delete('debug_circle')
+        self.canvas.delete('highlight')
+        r = 8 # Slightly larger than the guide circle (r=6)
+        self.slot_items = {}
+        self.slot_states = {}
+        for row_name in ('row1', 'row2', 'row3'):
+            y = self.coords[f"{row_name}_y"]
+            for i in range(10):
+                x = self.coords['start_x'] + (i * self.coords['spacing_x'])
+                self.slot_items[(row_name, i)] = self.canvas.create_oval(
+                    x-r, y-r, x+r, y+r, state='hidden', tags='debug_circle')
+                self.slot_states[(row_name, i)] = -1
+        
+        bx = self.coords['button_x']
+        self.highlight_items = {}
+        self.highlight_colors = {}
+        for row_name in ('row1', 'row2', 'row3'):
+            y = self.coords[f"{row_name}_y"]
+            self.highlight_items[row_name] = self.canvas.create_rectangle(
+                bx-25, y-25, bx+25, y+25, width=5, state='hidden', tags='highlight')
+            # None: hidden, otherwise the outline color shown
+            self.highlight_colors[row_name] = None
+        
+        # Keep showing what was on screen before the coords changed
+        if previous_slots:
+            self.update_debug_circles({row_name: [previous_slots[(row_name, i)] for i in range(10)]
+                                       for row_name in ('row1', 'row2', 'row3')})
+        for row_name, color in previous_highlights.items():
+            if color is not None:
+                self.canvas.itemconfigure(self.highlight_items[row_name], outline=color, state='normal')
+                self.highlight_colors[row_name] = color
+
+    def format_redraw_stats(self):
+        total = self.redraws + self.redraws_avoided
+        pct = self.redraws_avoided / total * 100 if total else 0.0
+        return f"Overlay items: {self.redraws} updated, {self.redraws_avoided} unchanged ({pct:.1f}% avoided)"
 
     def set_ocr_box_visibility(self, visible):
         state = 'normal' if visible else 'hidden'
@@ -179,40 +185,34 @@ class VisualOverlay(tk.Toplevel):
     def update_probability_text(self, text):
         self.canvas.itemconfig(self.prob_text_id, text=text)
 
+    def update_outcome_text(self, text):
+        self.canvas.itemconfig(self.outcome_text_id, text=text)
+
     def update_ocr_text(self, text):
         self.canvas.itemconfig(self.ocr_text_id, text=text)
 
     # update_current_prob_text removed as requested
 
     def highlight_recommendation(self, row_names, color='#00FF00'):
-        self.canvas.delete('highlight')
-        if not row_names:
-            return
-            
         # If single string, convert to list
         if isinstance(row_names, str):
             row_names = [row_names]
-            
-        # Map row name to y coord
-        y_map = {
-            'row1': self.coords['row1_y'],
-            'row2': self.coords['row2_y'],
-            'row3': self.coords['row3_y']
-        }
-        
-        bx = self.coords['button_x']
-        
-        for row_name in row_names:
-            if row_name in y_map:
-                y = y_map[row_name]
-                # Draw thick box with specified color
-                self.canvas.create_rectangle(bx-25, y-25, bx+25, y+25, outline=color, width=5, tags='highlight')
+        row_names = row_names or []
+        
+        for row_name, item in self.highlight_items.items():
+            # Thick box with specified color on recommended rows
+            wanted = color if row_name in row_names else None
+            if self.highlight_colors[row_name] == wanted:
+                self.redraws_avoided += 1
+                continue
+            if wanted is None:
+                self.canvas.itemconfigure(item, state='hidden')
+            else:
+                self.canvas.itemconfigure(item, outline=wanted, state='normal')
+            self.highlight_colors[row_name] = wanted
+            self.redraws += 1
 
     def update_debug_circles(self, row_states):
-        self.canvas.delete('debug_circle')
-        
-        r = 8 # Slightly larger than the guide circle (r=6)
-        
         # Colors
         colors = {
             'row1': 'blue',
@@ -221,22 +221,27 @@ class VisualOverlay(tk.Toplevel):
         }
         
         for row_name, states in row_states.items():
-            if row_name not in self.coords:
-                # Construct y coord from coords dict if not directly available (it is available as row1_y etc)
-                pass
-            
-            y = self.coords[f"{row_name}_y"]
             color = colors.get(row_name, 'black')
             
             for i, state in enumerate(states):
-                x = self.coords['start_x'] + (i * self.coords['spacing_x'])
+                key = (row_name, i)
+                if key not in self.slot_items:
+                    continue
+                if self.slot_states[key] == state:
+                    self.redraws_avoided += 1
+                    continue
+                item = self.slot_items[key]
                 
                 if state == 1: # Success
-                    # Draw thick circle
-                    self.canvas.create_oval(x-r, y-r, x+r, y+r, outline=color, width=4, tags='debug_circle')
+                    # Thick circle
+                    self.canvas.itemconfigure(item, outline=color, width=4, state='normal')
                 elif state == 0: # Fail
-                    # Draw thin gray circle (optional, but good for feedback)
-                    self.canvas.create_oval(x-r, y-r, x+r, y+r, outline='gray', width=2, tags='debug_circle')
+                    # Thin gray circle (optional, but good for feedback)
+                    self.canvas.itemconfigure(item, outline='gray', width=2, state='normal')
+                else: # Empty
+                    self.canvas.itemconfigure(item, state='hidden')
+                self.slot_states[key] = state
+                self.redraws += 1
 
     def set_click_through(self, enable):
         """Set this window to be transparent to mouse clicks."""
@@ -260,9 +265,9 @@ class VisualOverlay(tk.Toplevel):
                 # Force window update using SetWindowPos
                 # SWP_NOMOVE | SWP_NOSIZE | SWP_NOZORDER | SWP_FRAMECHANGED (0x27)
                 windll.user32.SetWindowPos(hwnd, 0, 0, 0, 0, 0, 0x27)
-                print(f"Click-through {'ENABLED' if enable else 'DISABLED'} (Style: {hex(new_style)})")
+                log.info("Click-through %s (Style: %s)", 'ENABLED' if enable else 'DISABLED', hex(new_style))
         except Exception as e:
-            print(f"Error setting click-through: {e}")
+            log.error("Error setting click-through: %s", e)
 
     def get_geometry(self):
         return {
@@ -291,7 +296,7 @@ class ControlPanel:
         self.is_running = False
         
         self.root.title("Control Panel")
-        self.root.geometry("300x450") # Increased height for scale control
+        self.root.geometry("300x560") # Increased height for scale control and stats
         self.root.attributes('-topmost', True)
         
         # Status
@@ -358,6 +363,11 @@ class ControlPanel:
         # Instructions
         tk.Label(root, text="Press 'Q' to Stop").pack(pady=5)
         
+        # Stage timings (filled by set_stats_source)
+        self.stats_source = None
+        self.stats_label = tk.Label(root, text="", font=('Consolas', 8), justify='left', anchor='w')
+        self.stats_label.pack(fill='x', padx=10, pady=2)
+        
         # Create Overlay Window
         self.overlay = VisualOverlay(root)
 
@@ -401,6 +411,21 @@ class ControlPanel:
         self.scale_down_btn.config(state=state)
         self.scale_up_btn.config(state=state)
         
+    def set_stats_source(self, source, interval_ms=1000):
+        """Show source() (a text block) in the stats panel, refreshed every interval_ms."""
+        first = self.stats_source is None
+        self.stats_source = source
+        self.stats_interval = interval_ms
+        if first:
+            self.root.after(interval_ms, self.refresh_stats)
+
+    def refresh_stats(self):
+        try:
+            self.stats_label.config(text=self.stats_source())
+        except Exception as e:
+            log.error("Stats Panel Error: %s", e)
+        self.root.after(self.stats_interval, self.refresh_stats)
+
     def set_start_enabled(self, enabled):
         state = 'normal' if enabled else 'disabled'
         self.start_btn.config(state=state)
@@ -466,6 +491,9 @@ class ControlPanel:
     def update_probability_text(self, text):
         self.root.after(0, lambda: self.overlay.update_probability_text(text))
 
+    def update_outcome_text(self, text):
+        self.root.after(0, lambda: self.overlay.update_outcome_text(text))
+
     def update_debug_circles(self, row_states):
         self.root.after(0, lambda: self.overlay.update_debug_circles(row_states))
 
@@ -476,7 +504,8 @@ class ControlPanel:
         self.root.after(0, lambda: self.overlay.set_ocr_box_visibility(visible))
 
 if __name__ == "__main__":
+    setup_logging("INFO", log_file=None)
     root = tk.Tk()
     # Hide root window if we want, but here root is the controller
-    app = ControlPanel(root, lambda: print("Start"), lambda: print("Stop"), lambda: print("Vis"), lambda: print("Clk"), lambda: print("Reset"))
+    app = ControlPanel(root, lambda: log.info("Start"), lambda: log.info("Stop"), lambda: log.info("Vis"), lambda: log.info("Clk"), lambda: log.info("Reset"))
     root.mainloop()
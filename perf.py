@@ -0,0 +1,191 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (bucket edges in milliseconds).
+    Cheap enough to record every capture; percentiles are bucket upper bounds.
+    """
+    BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, name="", buckets_ms=BUCKETS_MS):
+        self.name = name
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # Last bucket collects everything above the largest edge
+            self.counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper bucket edge below which q percent of samples fall."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q / 100 * self.count
+            seen = 0
+            for edge, n in zip(self.buckets_ms, self.counts):
+                seen += n
+                if seen >= rank:
+                    return edge
+            return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.mean_ms,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets_ms": list(self.buckets_ms),
+            "counts": list(self.counts),
+        }
+
+    def format(self):
+        if not self.count:
+            return f"{self.name}: no samples"
+        return (f"{self.name}: n={self.count} mean={self.mean_ms:.2f}ms "
+                f"p50<={self.percentile(50):g}ms p95<={self.percentile(95):g}ms "
+                f"p99<={self.percentile(99):g}ms max={self.max_ms:.2f}ms")
+
+
+class RollingPercentiles:
+    """
+    The last `size` samples of one stage in a fixed ring buffer (milliseconds).
+    Percentiles are exact over that window, so old spikes age out.
+    """
+    def __init__(self, name="", size=1024):
+        self.name = name
+        self.samples = np.zeros(size)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.index = 0
+            self.filled = 0
+            self.count = 0
+            self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.samples[self.index] = ms
+            self.index = (self.index + 1) % len(self.samples)
+            self.filled = min(self.filled + 1, len(self.samples))
+            self.count += 1
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        with self._lock:
+            window = self.samples[:self.filled].copy()
+        if not len(window):
+            return [0.0] * len(qs)
+        return np.percentile(window, qs).tolist()
+
+    def as_dict(self):
+        p50, p95, p99 = self.percentiles()
+        return {"count": self.count, "window": self.filled,
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": self.max_ms}
+
+    def format(self):
+        if not self.count:
+            return f"{self.name}: no samples"
+        p50, p95, p99 = self.percentiles()
+        return f"{self.name}: p50={p50:.2f} p95={p95:.2f} p99={p99:.2f} ms (n={self.count})"
+
+
+class _Span:
+    __slots__ = ("stats", "clock", "start")
+
+    def __init__(self, stats, clock):
+        self.stats = stats
+        self.clock = clock
+
+    def __enter__(self):
+        self.start = self.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record((self.clock() - self.start) / 1e9)
+
+
+class Instrumentation:
+    """
+    Named monotonic-clock spans around the scan loop stages, each kept in a
+    RollingPercentiles window:
+
+        with spans.span("capture"):
+            frame = vision.capture_frame(region)
+    """
+    def __init__(self, size=1024, clock=time.perf_counter_ns):
+        self.size = size
+        self.clock = clock
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, RollingPercentiles(name, self.size))
+        return stats
+
+    def span(self, name):
+        return _Span(self.get(name), self.clock)
+
+    def record(self, name, seconds):
+        self.get(name).record(seconds)
+
+    def reset(self):
+        for stats in list(self.stages.values()):
+            stats.reset()
+
+    def as_dict(self):
+        return {name: stats.as_dict() for name, stats in list(self.stages.items())}
+
+    def format(self):
+        stages = list(self.stages.values())
+        if not stages:
+            return "no samples"
+        return "\n".join(stats.format() for stats in stages)
+
+    def dump(self, path, extra=None):
+        """Write the stage percentiles (plus any extra JSON-able dict) to path."""
+        data = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": self.as_dict()}
+        if extra:
+            data.update(extra)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from logger import get_logger
+from solver import DEFAULT_SPEC, QTable, SymmetricQTable, solve_q_table
+
+log = get_logger(__name__)
+
+
+class CacheStats:
+    """Hit/miss counter, exposed so benchmarks can check the hit rate."""
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+class QTableCache:
+    """
+    On-disk cache of solved Q-tables, one .npy file per (spec, t1, t2, t3).
+    Each table has a small .json sidecar with the schema version, the solver
+    inputs and a CRC32 checksum of the array data. Tables are opened with
+    np.load(mmap_mode='r'), so a cached table is ready in milliseconds.
+    """
+    # Bump when the table layout or solver semantics change
+    SCHEMA_VERSION = 3
+
+    def __init__(self, directory="qtables"):
+        self.directory = directory
+        # hit: loaded from disk, miss: had to solve
+        self.stats = CacheStats()
+
+    def get_paths(self, t1, t2, t3, spec=DEFAULT_SPEC):
+        name = f"q_{spec.name}_{t1}_{t2}_{t3}"
+        return (os.path.join(self.directory, name + ".npy"),
+                os.path.join(self.directory, name + ".json"))
+
+    def make_meta(self, t1, t2, t3, spec):
+        return {
+            "schema": self.SCHEMA_VERSION,
+            "targets": [t1, t2, t3],
+            "spec": spec.fingerprint(),
+        }
+
+    def load(self, t1, t2, t3, spec=DEFAULT_SPEC, verify=True):
+        """
+        Memory-map a cached table. Returns None if it is missing or stale
+        (different schema/inputs, or checksum mismatch).
+        """
+        npy_path, meta_path = self.get_paths(t1, t2, t3, spec)
+        if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+            return None
+
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            expected = self.make_meta(t1, t2, t3, spec)
+            if any(meta.get(k) != v for k, v in expected.items()):
+                log.info("Q-table cache stale: %s", npy_path)
+                return None
+
+            q = np.load(npy_path, mmap_mode='r')
+            if list(q.shape) != meta.get("shape") or str(q.dtype) != meta.get("dtype"):
+                log.info("Q-table cache stale (shape): %s", npy_path)
+                return None
+            if verify and zlib.crc32(q) != meta.get("checksum"):
+                log.warning("Q-table cache checksum mismatch: %s", npy_path)
+                return None
+        except Exception as e:
+            log.error("Error loading Q-table cache: %s", e)
+            return None
+
+        table_class = SymmetricQTable if spec.symmetric else QTable
+        return table_class(q, t1, t2, t3, spec)
+
+    def save(self, table):
+        os.makedirs(self.directory, exist_ok=True)
+        npy_path, meta_path = self.get_paths(*table.targets, table.spec)
+
+        q = np.ascontiguousarray(table.q)
+        meta = self.make_meta(*table.targets, table.spec)
+        meta.update({
+            "shape": list(q.shape),
+            "dtype": str(q.dtype),
+            "checksum": zlib.crc32(q),
+        })
+
+        # Write to temp files first so a crash never leaves a half-written table
+        tmp_npy = npy_path + ".tmp"
+        with open(tmp_npy, 'wb') as f:
+            np.save(f, q)
+        with open(meta_path + ".tmp", 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_npy, npy_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def get(self, t1, t2, t3, spec=DEFAULT_SPEC):
+        """Load the table from disk, or solve and store it if missing/stale."""
+        table = self.load(t1, t2, t3, spec)
+        if table is not None:
+            self.stats.hits += 1
+            return table
+
+        self.stats.misses += 1
+        log.info("Solving Q-table for %s (%s, %s, %s)...", spec.name, t1, t2, t3)
+        table = solve_q_table(t1, t2, t3, spec)
+        log.info("Solved %s (%s, %s, %s): %.1f MB in %.2fs", spec.name, t1, t2, t3, table.nbytes / 1e6, table.solve_time)
+        try:
+            self.save(table)
+        except Exception as e:
+            log.error("Error saving Q-table cache: %s", e)
+        return table
+
+
+class QTableStore:
+    """
+    In-memory store of solved Q-tables, one per (spec, t1, t2, t3), so switching
+    goal/penalty settings never throws away a solved table.
+    Least recently used tables are evicted once max_bytes is exceeded
+    (the most recent table is always kept).
+    """
+    def __init__(self, disk_cache=None, max_bytes=512 * 1024 * 1024):
+        self.disk_cache = disk_cache
+        self.max_bytes = max_bytes
+        self.tables = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # hit: table already in memory, miss: loaded from disk or solved
+        self.stats = CacheStats()
+        self.evictions = 0
+
+    def __contains__(self, key):
+        # key: (spec, t1, t2, t3)
+        with self._lock:
+            return tuple(key) in self.tables
+
+    def get(self, t1, t2, t3, spec=DEFAULT_SPEC):
+        key = (spec, t1, t2, t3)
+        with self._lock:
+            if key in self.tables:
+                self.stats.hits += 1
+                self.tables.move_to_end(key)
+                return self.tables[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One loader per key; a second caller waits for the first instead of re-solving
+        with key_lock:
+            with self._lock:
+                if key in self.tables:
+                    self.stats.hits += 1
+                    self.tables.move_to_end(key)
+                    return self.tables[key]
+                self.stats.misses += 1
+
+            if self.disk_cache is not None:
+                table = self.disk_cache.get(t1, t2, t3, spec)
+            else:
+                table = solve_q_table(t1, t2, t3, spec)
+
+            with self._lock:
+                self.tables[key] = table
+                self.evict()
+        return table
+
+    def evict(self):
+        # Caller holds self._lock
+        while len(self.tables) > 1 and self.total_bytes() > self.max_bytes:
+            (spec, *targets), _ = self.tables.popitem(last=False)
+            self.evictions += 1
+            log.info("Q-table evicted: %s %s", spec.name, tuple(targets))
+
+    def total_bytes(self):
+        return sum(table.nbytes for table in self.tables.values())
+
+    def prewarm(self, targets_list, spec=DEFAULT_SPEC):
+        """Load/solve the given target settings on a background thread."""
+        def _run():
+            for targets in targets_list:
+                try:
+                    self.get(*targets, spec)
+                except Exception as e:
+                    log.error("Q-table prewarm error %s: %s", targets, e)
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
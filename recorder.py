@@ -0,0 +1,244 @@
+"""
+Compact binary session log of the scan loop.
+
+One file per session: a header with JSON meta, then one record per
+recognized state change:
+    timestamp, slot changes since the previous record (delta-encoded),
+    OCR label/score, expected digit, recommended rows, win probability,
+    OCR ROI crop (raw uint8, optionally zlib'd).
+
+The scan loop only enqueues; a background thread encodes and writes.
+
+    python recorder.py captures/session_1700000000.fses   # summary of a log
+"""
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+MAGIC = b"FSES"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")      # magic, version, meta length (JSON follows)
+RECORD = struct.Struct("<dcfcfBB")   # timestamp, label, score, expected, win, move mask, slot changes
+DELTA = np.dtype([('index', 'u1'), ('state', 'i1')])
+ROI = struct.Struct("<BHHBI")        # flags, height, width, channels, payload length
+ROI_ZLIB = 1
+
+ROW_NAMES = ('row1', 'row2', 'row3')
+SLOT_COUNT = 30
+UNKNOWN = b'?'
+
+
+class SessionRecord(NamedTuple):
+    timestamp: float
+    slots: np.ndarray          # (3, 10) int8: -1 empty, 0 fail, 1 success
+    label: Optional[str]
+    score: float
+    expected: Optional[str]    # digit the game rule predicted (ocr_eval label)
+    move: Optional[List[str]]
+    win: float
+    roi: Optional[np.ndarray]
+
+
+def _to_byte(text):
+    return text.encode('ascii')[:1] if text else UNKNOWN
+
+
+def _from_byte(b):
+    return None if b == UNKNOWN else b.decode('ascii')
+
+
+class SessionRecorder:
+    """
+    Appends records to a session log from a background writer thread.
+    record() copies its inputs and returns immediately; when the queue is
+    full the record is dropped (and counted) rather than blocking the caller.
+    """
+    def __init__(self, path, meta=None, compress=True, max_queue=256):
+        self.path = path
+        self.meta = meta or {}
+        self.compress = compress
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.error = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+            self.thread.start()
+        return self
+
+    def record(self, row_states, roi=None, label=None, score=0.0, expected=None,
+               move=None, win=0.0, timestamp=None):
+        """Queue one state: row_states dict, OCR ROI (any uint8 array) and results."""
+        slots = np.array([row_states[r] for r in ROW_NAMES], dtype=np.int8)
+        # The ROI is usually a view into a capture buffer that gets reused
+        roi = np.array(roi, dtype=np.uint8) if roi is not None else None
+        item = (time.time() if timestamp is None else timestamp, slots, label, score, expected, move, win, roi)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Flush queued records and stop the writer thread, waiting at most about 2 * timeout."""
+        if self.thread is not None:
+            # A writer that died (open/write error) never drains the queue: no sentinel then
+            if self.thread.is_alive():
+                try:
+                    self.queue.put(None, timeout=timeout)
+                except queue.Full:
+                    pass
+                self.thread.join(timeout)
+            self.thread = None
+
+    def format(self):
+        text = f"Session log {self.path}: {self.written} records, {self.bytes_written / 1024:.1f} KiB"
+        if self.dropped:
+            text += f", {self.dropped} dropped"
+        if self.error:
+            text += f", error: {self.error}"
+        return text
+
+    def encode(self, item, previous):
+        """Bytes of one record, slots delta-encoded against previous (3, 10) states."""
+        timestamp, slots, label, score, expected, move, win, roi = item
+        flat = slots.ravel()
+        changed = np.flatnonzero(flat != previous.ravel())
+        delta = np.empty(len(changed), dtype=DELTA)
+        delta['index'] = changed
+        delta['state'] = flat[changed]
+        move_mask = sum(1 << ROW_NAMES.index(r) for r in (move or []))
+
+        parts = [RECORD.pack(timestamp, _to_byte(label), score, _to_byte(expected), win,
+                             move_mask, len(changed)), delta.tobytes()]
+        if roi is None:
+            parts.append(ROI.pack(0, 0, 0, 0, 0))
+        else:
+            h, w = roi.shape[:2]
+            channels = roi.shape[2] if roi.ndim == 3 else 1
+            payload = roi.tobytes()
+            flags = 0
+            if self.compress:
+                payload = zlib.compress(payload, 1)
+                flags |= ROI_ZLIB
+            parts.append(ROI.pack(flags, h, w, channels, len(payload)))
+            parts.append(payload)
+        return b"".join(parts)
+
+    def _run(self):
+        previous = np.full((len(ROW_NAMES), SLOT_COUNT // len(ROW_NAMES)), -1, dtype=np.int8)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            meta = json.dumps(self.meta).encode('utf-8')
+            with open(self.path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(meta)) + meta)
+                f.flush()
+                self.bytes_written = HEADER.size + len(meta)
+                while True:
+                    item = self.queue.get()
+                    if item is None:
+                        break
+                    data = self.encode(item, previous)
+                    f.write(data)
+                    # Flush once the queue is drained, so a killed process loses at most the current batch
+                    if self.queue.empty():
+                        f.flush()
+                    previous = item[1]
+                    self.written += 1
+                    self.bytes_written += len(data)
+        except Exception as e:
+            self.error = e
+            log.error("Session recorder error: %s", e)
+
+
+def read_session_log(path):
+    """(meta, [SessionRecord]) of a session log; a truncated last record is ignored."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, meta_len = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} session log")
+    pos = HEADER.size
+    meta = json.loads(data[pos:pos + meta_len].decode('utf-8'))
+    pos += meta_len
+
+    records = []
+    slots = np.full(SLOT_COUNT, -1, dtype=np.int8)
+    try:
+        while pos < len(data):
+            timestamp, label, score, expected, win, move_mask, n_changes = RECORD.unpack_from(data, pos)
+            pos += RECORD.size
+            delta = np.frombuffer(data, dtype=DELTA, count=n_changes, offset=pos)
+            pos += delta.nbytes
+            slots = slots.copy()
+            slots[delta['index']] = delta['state']
+
+            flags, h, w, channels, length = ROI.unpack_from(data, pos)
+            pos += ROI.size
+            roi = None
+            if length:
+                payload = data[pos:pos + length]
+                if len(payload) < length:
+                    break
+                if flags & ROI_ZLIB:
+                    payload = zlib.decompress(payload)
+                shape = (h, w, channels) if channels > 1 else (h, w)
+                roi = np.frombuffer(payload, dtype=np.uint8).reshape(shape)
+                pos += length
+
+            move = [r for i, r in enumerate(ROW_NAMES) if move_mask & (1 << i)] or None
+            records.append(SessionRecord(timestamp, slots.reshape(len(ROW_NAMES), -1), _from_byte(label),
+                                         score, _from_byte(expected), move, win, roi))
+    except (struct.error, ValueError):
+        # Log cut off mid-record (e.g. the bot was killed)
+        pass
+    return meta, records
+
+
+def check_dead_writer(timeout=1.0):
+    """close() must return when the writer thread died with a full queue. Returns True if it did."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        # A directory cannot be opened as a file: the writer fails on open
+        recorder = SessionRecorder(tmp, max_queue=4).start()
+        recorder.thread.join(timeout)
+        rows = {r: [-1] * (SLOT_COUNT // len(ROW_NAMES)) for r in ROW_NAMES}
+        for _ in range(8):
+            recorder.record(rows)
+        closer = threading.Thread(target=recorder.close, kwargs={"timeout": timeout}, daemon=True)
+        closer.start()
+        closer.join(3 * timeout)
+        return not closer.is_alive() and recorder.error is not None and recorder.dropped == 4
+
+
+if __name__ == "__main__":
+    #   python recorder.py --check   # close() with a dead writer thread
+    if sys.argv[1:] == ["--check"]:
+        ok = check_dead_writer()
+        print(f"Dead writer close: {'ok' if ok else 'FAILED'}")
+        sys.exit(0 if ok else 1)
+    for path in sys.argv[1:]:
+        meta, records = read_session_log(path)
+        size = os.path.getsize(path)
+        print(f"{path}: {len(records)} records, {size / 1024:.1f} KiB, meta {meta}")
+        for r in records:
+            slots = "|".join("".join('.xo'[v + 1] for v in row) for row in r.slots.tolist())
+            print(f"  {time.strftime('%H:%M:%S', time.localtime(r.timestamp))} {slots} "
+                  f"ocr={r.label}({r.score:.2f}) exp={r.expected} move={r.move} win={r.win * 100:.2f}%")
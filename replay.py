@@ -0,0 +1,279 @@
+"""
+Headless replay of a recorded session through the scan loop's hot path:
+capture -> slot analysis -> OCR -> recommend_move, at max speed.
+
+    python replay.py session.npz                          # frames/sec and per-stage latency
+    python replay.py captures/run1 --write-golden g.json  # record the recommendations
+    python replay.py session.npz --golden g.json          # diff against them
+    python replay.py --synthetic session.npz              # write a synthetic test session
+    python replay.py --synthetic s.npz --scale 1.05       # ... at a UI scale (replaying it checks the OCR)
+
+A session is a .npz written by capture.save_session, or a directory of PNG
+frames with a session.json; its meta gives the overlay region and coords.
+Synthetic sessions also record the digit in every frame, and replaying
+one exits non-zero if the OCR misreads any of them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+import overlay_geometry
+from capture import open_frame_source, save_session
+from game_logic import GOAL_TARGETS, PENALTY_LIMITS, StoneFacetingLogic
+from ocr_subproject.new_ocr import NewOcrEngine
+from perf import LatencyHistogram
+from qtable_cache import QTableCache, QTableStore
+from solver import DEFAULT_SPEC
+from vision import ROW_NAMES, SLOTS_PER_ROW, Vision
+
+VALID_LABELS = ('2', '3', '4', '5', '6', '7')
+STAGES = ("capture", "analyze", "ocr", "recommend")
+SLOT_CHARS = {-1: '.', 0: 'x', 1: 'o'}
+# Fields compared against a golden log ("win" with a tolerance)
+GOLDEN_FIELDS = ("slots", "ocr", "move")
+WIN_TOLERANCE = 1e-6
+# Templates and solved tables next to this file, wherever replay is run from
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_subproject")
+QTABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qtables")
+
+
+def check_templates(ocr, resolution):
+    """Raise unless the engine has templates for resolution (else every frame reads 'N')."""
+    if resolution not in ocr.template_stacks:
+        raise FileNotFoundError(f"No OCR templates for {resolution} in {ocr.base_dir}")
+
+
+def slots_to_str(row_states):
+    """'oox.......|..........|x.........' for a row_states dict."""
+    return "|".join("".join(SLOT_CHARS[v] for v in row_states[r]) for r in ROW_NAMES)
+
+
+def replay(source, ocr=None, table_store=None, limit=None):
+    """
+    Run every frame of a session through Vision, NewOcrEngine and
+    StoneFacetingLogic. Returns a report with per-frame records, frames/sec
+    and per-stage latency histograms.
+    """
+    backend, meta = open_frame_source(source)
+    if 'coords' not in meta or 'region' not in meta:
+        raise ValueError(f"{source}: session meta has no overlay region/coords")
+    coords, region = meta['coords'], meta['region']
+    ocr_coords = coords['prob_ocr_box']
+    resolution = meta.get('resolution', 'FHD')
+    scale = meta.get('scale', 1.0)
+
+    vision = Vision(coords, capture=backend)
+    ocr = ocr if ocr is not None else NewOcrEngine(BASE_DIR)
+    check_templates(ocr, resolution)
+    if table_store is None:
+        table_store = QTableStore(QTableCache(QTABLE_DIR))
+    logic = StoneFacetingLogic(table_store=table_store)
+    logic.set_targets(*GOAL_TARGETS[meta.get('goal', '97')])
+    logic.set_penalty_limit(PENALTY_LIMITS[bool(meta.get('penalty_allowed', False))])
+    # Load the Q-table and build the OCR templates (on this thread) before the clock starts
+    logic.get_q_table()
+    ocr.bank.get(resolution, scale, (ocr_coords['y2'] - ocr_coords['y1'], ocr_coords['x2'] - ocr_coords['x1']))
+
+    latency = {stage: LatencyHistogram(stage) for stage in STAGES}
+    records = []
+    count = len(backend.frames) if limit is None else min(limit, len(backend.frames))
+    clock = time.perf_counter
+    start = clock()
+    for i in range(count):
+        backend.index = i
+        t0 = clock()
+        frame = vision.capture_frame(region, ocr_coords)
+        t1 = clock()
+        row_states = vision.analyze_frame(frame)
+        t2 = clock()
+        result = ocr.predict(vision.get_ocr_view(frame, ocr_coords), resolution=resolution, scale=scale)
+        t3 = clock()
+        logic.slots = row_states
+        if result.label in VALID_LABELS:
+            logic.set_probability_from_ocr(result.label)
+        move = logic.recommend_move()
+        win = logic.calculate_max_win_probability()
+        t4 = clock()
+
+        for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            latency[stage].record(seconds)
+        records.append({
+            "frame": i,
+            "slots": slots_to_str(row_states),
+            "ocr": result.label,
+            "score": round(result.score, 4),
+            "move": move,
+            "win": win,
+        })
+    elapsed = clock() - start
+    # Synthetic sessions know the digit in every frame
+    ocr_errors = [(r["frame"], label, r["ocr"]) for r, label in zip(records, meta.get('labels', []))
+                  if r["ocr"] != label]
+
+    return {
+        "source": source,
+        "frames": count,
+        "seconds": elapsed,
+        "fps": count / elapsed if elapsed else 0.0,
+        "latency": {stage: hist.as_dict() for stage, hist in latency.items()},
+        "records": records,
+        "ocr_errors": ocr_errors,
+        "_histograms": latency,
+    }
+
+
+def diff_golden(records, golden):
+    """[(frame, field, golden value, replayed value)] for every disagreement."""
+    diffs = []
+    if len(records) != len(golden):
+        diffs.append((None, "frames", len(golden), len(records)))
+    for old, new in zip(golden, records):
+        for field in GOLDEN_FIELDS:
+            if old.get(field) != new.get(field):
+                diffs.append((new["frame"], field, old.get(field), new.get(field)))
+        if abs(old.get("win", 0.0) - new["win"]) > WIN_TOLERANCE:
+            diffs.append((new["frame"], "win", old.get("win"), new["win"]))
+    return diffs
+
+
+# Slot colors (RGB) the classifier sees: empty, fail, success row1/2, success row3
+EMPTY_RGB, FAIL_RGB, BLUE_RGB, RED_RGB = (125, 128, 132), (160, 160, 165), (90, 140, 230), (240, 120, 100)
+
+
+def synthetic_session(path, resolution='FHD', scale=1.0, seed=0, idle_frames=2, origin=(100, 100)):
+    """
+    Write a session of one stone clicked at random, following the game's
+    probability ladder, with the probability digit pasted from the bundled
+    OCR templates (resized by the UI scale, like the game draws it). Each
+    state is held for idle_frames identical frames; meta['labels'] has the
+    digit shown in every frame.
+    """
+    coords = overlay_geometry.overlay_coords(resolution, scale)
+    ocr_box = coords['prob_ocr_box']
+    x1, y1 = ocr_box['x1'], ocr_box['y1']
+    h, w = ocr_box['y2'] - y1, ocr_box['x2'] - x1
+    width, height = overlay_geometry.overlay_size(resolution, scale)
+    region = {'x': origin[0], 'y': origin[1], 'width': width, 'height': height}
+
+    rng = np.random.default_rng(seed)
+    digits = {}
+    for label in VALID_LABELS:
+        template_path = os.path.join(BASE_DIR, resolution, f"{label}_best.png")
+        digit = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+        if digit is None:
+            raise FileNotFoundError(f"Missing OCR template {template_path}")
+        if scale != 1.0:
+            digit = cv2.resize(digit, None, fx=scale, fy=scale,
+                               interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+        digits[label] = digit
+    background = rng.integers(40, 90, size=(region['height'], region['width'], 4), dtype=np.uint8)
+    box_fill = int(rng.integers(60, 200))
+
+    spec = DEFAULT_SPEC
+    states = np.full((len(ROW_NAMES), SLOTS_PER_ROW), -1, dtype=np.int8)
+    p_idx = spec.start_p_idx
+
+    def draw(label):
+        frame = background.copy()
+        for r in range(len(ROW_NAMES)):
+            y = coords[f'row{r + 1}_y']
+            for i in range(SLOTS_PER_ROW):
+                x = int(coords['start_x'] + i * coords['spacing_x'])
+                state = states[r, i]
+                rgb = EMPTY_RGB if state == -1 else FAIL_RGB if state == 0 else RED_RGB if r == 2 else BLUE_RGB
+                frame[y - 3:y + 4, x - 3:x + 4, :3] = rgb[::-1]
+        box = frame[y1:y1 + h, x1:x1 + w, :3]
+        box[:] = box_fill
+        digit = digits[label]
+        dh, dw = min(digit.shape[0], h), min(digit.shape[1], w)
+        box[:dh, :dw] = digit[:dh, :dw, None]
+        return frame
+
+    frames, labels = [], []
+
+    def hold():
+        label = str(int(round(spec.probs[p_idx] * 100)) // 10)
+        frames.extend([draw(label)] * idle_frames)
+        labels.extend([label] * idle_frames)
+
+    hold()
+    while (states == -1).any():
+        row = rng.choice(np.flatnonzero((states == -1).any(axis=1)))
+        slot = int(np.argmax(states[row] == -1))
+        success = rng.random() < spec.probs[p_idx]
+        states[row, slot] = int(success)
+        p_idx = spec.next_p_idx(p_idx, success)
+        hold()
+
+    meta = {
+        'origin': list(origin),
+        'region': region,
+        'coords': coords,
+        'resolution': resolution,
+        'scale': scale,
+        'goal': '97',
+        'penalty_allowed': False,
+        'synthetic_seed': seed,
+        'labels': labels,
+    }
+    save_session(path, frames, meta)
+    return len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="session .npz or PNG frame directory")
+    parser.add_argument("--golden", help="diff the recommendations against this golden log")
+    parser.add_argument("--write-golden", help="write the per-frame results as a golden log")
+    parser.add_argument("--no-cache", action="store_true", help="disable the OCR result cache")
+    parser.add_argument("--limit", type=int, help="replay at most this many frames")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--qtables", default=QTABLE_DIR, help="Q-table cache directory (default: %(default)s)")
+    parser.add_argument("--synthetic", action="store_true", help="write a synthetic session to SOURCE and exit")
+    parser.add_argument("--resolution", default="FHD", choices=list(overlay_geometry.LAYOUTS), help="for --synthetic")
+    parser.add_argument("--scale", type=float, default=1.0, help="for --synthetic")
+    parser.add_argument("--seed", type=int, default=0, help="for --synthetic")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        count = synthetic_session(args.source, args.resolution, args.scale, args.seed)
+        print(f"Wrote {count} frames to {args.source}")
+        return
+
+    ocr = NewOcrEngine(BASE_DIR, cache_size=0) if args.no_cache else NewOcrEngine(BASE_DIR)
+    report = replay(args.source, ocr=ocr, table_store=QTableStore(QTableCache(args.qtables)), limit=args.limit)
+    histograms = report.pop("_histograms")
+    print(f"{report['frames']} frames in {report['seconds']:.3f}s ({report['fps']:.0f} frames/s)")
+    for hist in histograms.values():
+        print("  " + hist.format())
+    for frame, expected, got in report["ocr_errors"][:20]:
+        print(f"  frame {frame}: OCR read {got!r}, digit shown {expected!r}")
+    if report["ocr_errors"]:
+        print(f"{len(report['ocr_errors'])} OCR errors against the synthetic labels")
+
+    if args.write_golden:
+        with open(args.write_golden, 'w') as f:
+            json.dump({"source": args.source, "records": report["records"]}, f, indent=1)
+        print(f"Wrote {args.write_golden}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.golden:
+        with open(args.golden, 'r') as f:
+            golden = json.load(f)["records"]
+        diffs = diff_golden(report["records"], golden)
+        for frame, field, old, new in diffs[:20]:
+            print(f"  frame {frame}: {field} {old!r} -> {new!r}")
+        print(f"{len(diffs)} differences against {args.golden}")
+        if diffs:
+            sys.exit(1)
+    sys.exit(1 if report["ocr_errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import time
+from perf import LatencyHistogram
+
+
+class ScanScheduler:
+    """
+    Adaptive timing for the scan loop.
+    Polls at idle_interval while nothing happens and at burst_interval for
+    burst_duration seconds after the slots change (players click in bursts).
+    A change counts as settled once settle_frames consecutive frames look
+    identical, instead of sleeping a fixed delay.
+    """
+    # SettingsManager key -> constructor argument
+    SETTINGS = {
+        "scan_idle_interval": "idle_interval",
+        "scan_burst_interval": "burst_interval",
+        "scan_burst_duration": "burst_duration",
+        "settle_frames": "settle_frames",
+        "settle_timeout": "settle_timeout",
+    }
+
+    def __init__(self, idle_interval=0.1, burst_interval=0.02, burst_duration=3.0,
+                 settle_frames=3, settle_timeout=0.5, clock=time.perf_counter, sleep=time.sleep):
+        self.idle_interval = idle_interval
+        self.burst_interval = burst_interval
+        self.burst_duration = burst_duration
+        self.settle_frames = max(1, int(settle_frames))
+        self.settle_timeout = settle_timeout
+        self.clock = clock
+        self.sleep = sleep
+
+        self.last_change = None
+        self.settle_timeouts = 0
+        self.settle_latency = LatencyHistogram("settle")
+        # From the last frame before the change (the click happened after it)
+        # to the recommendation being shown: an upper bound on click latency
+        self.click_latency = LatencyHistogram("click->recommendation")
+
+    @classmethod
+    def from_settings(cls, settings_manager):
+        kwargs = {arg: settings_manager.get(key) for key, arg in cls.SETTINGS.items()
+                  if settings_manager.get(key) is not None}
+        return cls(**kwargs)
+
+    def interval(self):
+        if self.last_change is not None and self.clock() - self.last_change < self.burst_duration:
+            return self.burst_interval
+        return self.idle_interval
+
+    def wait(self):
+        self.sleep(self.interval())
+
+    def frame_changed(self):
+        """Slot pixels changed: switch to the burst rate."""
+        self.last_change = self.clock()
+
+    def wait_for_settle(self, capture, signature, on_frame=None):
+        """
+        Call capture() at the burst rate until settle_frames consecutive frames
+        have equal signature(frame), or settle_timeout passes.
+        on_frame(frame), if given, sees every frame captured on the way.
+        Returns (last frame, settled).
+        """
+        start = self.clock()
+        frame = capture()
+        if on_frame is not None:
+            on_frame(frame)
+        last = signature(frame)
+        same = 1
+        while same < self.settle_frames:
+            if self.clock() - start >= self.settle_timeout:
+                self.settle_timeouts += 1
+                return frame, False
+            self.sleep(self.burst_interval)
+            frame = capture()
+            if on_frame is not None:
+                on_frame(frame)
+            current = signature(frame)
+            same = same + 1 if current == last else 1
+            last = current
+        self.settle_latency.record(self.clock() - start)
+        return frame, True
+
+    def format(self):
+        return "\n".join([
+            self.settle_latency.format() + f" (timeouts: {self.settle_timeouts})",
+            self.click_latency.format(),
+        ])
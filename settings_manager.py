@@ -1,5 +1,8 @@
 import json
 import os
+from logger import get_logger
+
+log = get_logger(__name__)
 
 class SettingsManager:
     DEFAULT_SETTINGS = {
@@ -7,7 +10,18 @@ class SettingsManager:
         "resolution": "FHD",
         "penalty_allowed": False,
         "overlay_x": 100,
-        "overlay_y": 100
+        "overlay_y": 100,
+        "ocr_box_mode": "outside", # "hide": legacy hide/show around every OCR capture
+        # Scan scheduler (seconds): idle polling (no slower than the old fixed 0.1s), burst after a change,
+        # and a change counts as settled after N identical frames
+        "scan_idle_interval": 0.1,
+        "scan_burst_interval": 0.02,
+        "scan_burst_duration": 3.0,
+        "settle_frames": 3,
+        "settle_timeout": 0.5,
+        # OCR majority vote over the last N frames of the settle window
+        "ocr_vote_frames": 3,
+        "log_level": "INFO" # DEBUG/INFO/WARNING; log file: bot.log (rotating)
     }
     
     def __init__(self, filepath="settings.json"):
@@ -26,16 +40,16 @@ class SettingsManager:
                 settings.update(data)
                 return settings
         except Exception as e:
-            print(f"Error loading settings: {e}")
+            log.error("Error loading settings: %s", e)
             return self.DEFAULT_SETTINGS.copy()
 
     def save_settings(self):
         try:
             with open(self.filepath, 'w') as f:
                 json.dump(self.settings, f, indent=4)
-            print("Settings saved.")
+            log.debug("Settings saved.")
         except Exception as e:
-            print(f"Error saving settings: {e}")
+            log.error("Error saving settings: %s", e)
 
     def get(self, key):
         return self.settings.get(key, self.DEFAULT_SETTINGS.get(key))
@@ -0,0 +1,164 @@
+"""
+Vectorized Monte Carlo simulator for checking the solver's policy.
+Plays many stones in parallel as NumPy arrays and compares the empirical
+win rate with the analytic Q-value.
+
+    python simulator.py --games 1000000
+    python simulator.py --targets 9 6 5 --policy optimal greedy row1 --workers 4
+"""
+import argparse
+import math
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from qtable_cache import QTableCache
+from solver import DEFAULT_SPEC, STONE_SPECS, choose_moves
+
+
+# --- Policies ---
+# policy(table, c, s, p) -> move index per game (0: row1, 1: row2, 2: row3)
+# c, s: (3, n) remaining slots / successes per row, p: (n,) probability index
+# (rows first so each row is a contiguous array)
+
+def optimal_policy(table, c, s, p):
+    """The solver's policy: first best row by Q-value (same as recommend_move)."""
+    q = table.get_q_values_many(*c, *s, p)
+    return choose_moves(q, *c)
+
+
+def first_valid(preferred, c):
+    """Use the preferred row if it has slots left, otherwise the first row that does."""
+    ok = c[preferred, np.arange(c.shape[1])] > 0
+    return np.where(ok, preferred, np.argmax(c > 0, axis=0))
+
+
+def greedy_policy(table, c, s, p):
+    """
+    Rule of thumb: at 50%+ click whichever of row1/row2 has fewer successes
+    (row1 on ties), below 50% dump the click into row3.
+    """
+    probs = np.asarray(table.spec.probs)
+    preferred = np.where(probs[p] < 0.5, 2, np.where(s[1] < s[0], 1, 0))
+    return first_valid(preferred, c)
+
+
+def row1_policy(table, c, s, p):
+    """Always row1 while it has slots, then row2, then row3."""
+    return first_valid(np.zeros(c.shape[1], dtype=np.intp), c)
+
+
+POLICIES = {
+    "optimal": optimal_policy,
+    "greedy": greedy_policy,
+    "row1": row1_policy,
+}
+
+
+def play(table, n_games, policy=optimal_policy, rng=None, start=None):
+    """
+    Play n_games stones from `start` (c1, c2, c3, s1, s2, s3, p_idx; default:
+    empty stone) and return the number of wins.
+    """
+    spec = table.spec
+    rng = np.random.default_rng(rng)
+    if start is None:
+        start = (spec.slots,) * 3 + (0, 0, 0, spec.start_p_idx)
+
+    c = np.repeat(np.array(start[:3], dtype=np.intp)[:, None], n_games, axis=1)
+    s = np.repeat(np.array(start[3:6], dtype=np.intp)[:, None], n_games, axis=1)
+    p = np.full(n_games, start[6], dtype=np.intp)
+    probs = np.asarray(spec.probs)
+    games = np.arange(n_games)
+    n_p = len(spec.probs)
+
+    # Every game fills exactly one slot per step
+    for _ in range(sum(start[:3])):
+        move = policy(table, c, s, p)
+        success = rng.random(n_games) < probs[p]
+        c[move, games] -= 1
+        s[move, games] += success
+        p = np.clip(p + np.where(success, spec.succ_step, spec.fail_step), 0, n_p - 1)
+
+    wins = spec.win_rule(s[0], s[1], s[2], *table.targets)
+    return int(np.count_nonzero(wins))
+
+
+def wilson_interval(wins, n, z=1.96):
+    """95% Wilson score interval for a win rate."""
+    if n == 0:
+        return (0.0, 0.0)
+    rate = wins / n
+    denom = 1 + z * z / n
+    center = (rate + z * z / (2 * n)) / denom
+    half = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / denom
+    return (max(0.0, center - half), min(1.0, center + half))
+
+
+def _play_chunk(args):
+    # Worker process: tables are memory-mapped from the disk cache, not pickled
+    t1, t2, t3, spec_name, n_games, policy_name, seed, start, directory = args
+    table = QTableCache(directory).get(t1, t2, t3, STONE_SPECS[spec_name])
+    return play(table, n_games, POLICIES[policy_name], np.random.default_rng(seed), start)
+
+
+def simulate(t1, t2, t3, n_games=1_000_000, policy="optimal", spec=DEFAULT_SPEC,
+             workers=1, seed=0, start=None, chunk_size=250_000, directory="qtables"):
+    """
+    Simulate n_games and compare with the analytic win probability.
+    workers > 1 spreads chunks across a process pool.
+    """
+    table = QTableCache(directory).get(t1, t2, t3, spec)
+    if start is None:
+        start = (spec.slots,) * 3 + (0, 0, 0, spec.start_p_idx)
+    analytic = max(0.0, *table.get_q_values(*start))
+
+    chunks = [min(chunk_size, n_games - i) for i in range(0, n_games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(t1, t2, t3, spec.name, n, policy, sd, start, directory) for n, sd in zip(chunks, seeds)]
+
+    begin = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            wins = sum(pool.map(_play_chunk, jobs))
+    else:
+        wins = sum(play(table, n, POLICIES[policy], np.random.default_rng(sd), start)
+                   for n, sd in zip(chunks, seeds))
+    elapsed = time.perf_counter() - begin
+
+    low, high = wilson_interval(wins, n_games)
+    return {
+        "targets": [t1, t2, t3],
+        "policy": policy,
+        "games": n_games,
+        "wins": wins,
+        "win_rate": wins / n_games,
+        "ci95": [low, high],
+        "analytic": analytic,
+        # Only meaningful for the optimal policy
+        "analytic_in_ci": low <= analytic <= high,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs=3, type=int, default=[9, 7, 4], metavar=("T1", "T2", "T3"))
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--policy", nargs="+", default=["optimal"], choices=list(POLICIES))
+    parser.add_argument("--spec", default=DEFAULT_SPEC.name, choices=list(STONE_SPECS))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for policy in args.policy:
+        r = simulate(*args.targets, n_games=args.games, policy=policy,
+                     spec=STONE_SPECS[args.spec], workers=args.workers, seed=args.seed)
+        print(f"{policy:8s} win rate {r['win_rate'] * 100:.4f}% "
+              f"(95% CI {r['ci95'][0] * 100:.4f}-{r['ci95'][1] * 100:.4f}%), "
+              f"analytic {r['analytic'] * 100:.4f}%, "
+              f"{r['games']} games in {r['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,627 @@
+import hashlib
+import time
+import types
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Tuple
+
+# Probability levels: 0.25, 0.35, 0.45, 0.55, 0.65, 0.75
+PROBS = (0.25, 0.35, 0.45, 0.55, 0.65, 0.75)
+SLOTS_PER_ROW = 10
+
+
+def default_win_rule(s1, s2, s3, t1, t2, t3):
+    """
+    (Row1 >= t1 and Row2 >= t2) OR (Row1 >= t2 and Row2 >= t1), Row3 <= t3.
+    Works on ints and on NumPy arrays.
+    """
+    cond1 = (s1 >= t1) & (s2 >= t2)
+    cond2 = (s1 >= t2) & (s2 >= t1)
+    return (cond1 | cond2) & (s3 <= t3)
+
+
+def _hash_value(value, digest):
+    """
+    Feed a rule's constant or captured value into digest. Code objects and
+    functions are hashed by content: their repr holds a memory address that
+    changes from run to run.
+    """
+    if isinstance(value, types.FunctionType):
+        value = value.__code__
+    if isinstance(value, types.CodeType):
+        digest.update(value.co_code)
+        digest.update(repr(value.co_names).encode())
+        for const in value.co_consts:
+            _hash_value(const, digest)
+    elif isinstance(value, (tuple, list)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(item, digest)
+    else:
+        digest.update(repr(value).encode())
+
+
+def rule_fingerprint(rule):
+    """
+    Qualified name plus a hash of the rule's bytecode, constants (including
+    nested lambdas/comprehensions), names, defaults and captured values, so
+    two different lambdas (both named '<lambda>') never share a cached table
+    and the same rule gets the same key in every process.
+    """
+    digest = hashlib.sha1()
+    _hash_value(rule, digest)
+    _hash_value(rule.__defaults__, digest)
+    _hash_value([cell.cell_contents for cell in rule.__closure__ or ()], digest)
+    return f"{rule.__module__}.{rule.__qualname__}:{digest.hexdigest()[:16]}"
+
+
+@dataclass(frozen=True)
+class StoneSpec:
+    """
+    Rules of one stone tier.
+    slots: slots per row
+    probs: success probability ladder, lowest first
+    succ_step / fail_step: ladder index change after a success / fail
+    win_rule: win_rule(s1, s2, s3, t1, t2, t3), must accept NumPy arrays
+    symmetric: win_rule is unchanged by swapping s1/s2 (halves the Q-table)
+    """
+    name: str = "10-slot"
+    slots: int = SLOTS_PER_ROW
+    probs: Tuple[float, ...] = PROBS
+    succ_step: int = -1
+    fail_step: int = 1
+    win_rule: Callable = default_win_rule
+    symmetric: bool = True
+
+    @property
+    def start_p_idx(self):
+        # Every stone starts at the top of the ladder (75%)
+        return len(self.probs) - 1
+
+    def next_p_idx(self, p_idx, success):
+        step = self.succ_step if success else self.fail_step
+        return min(max(p_idx + step, 0), len(self.probs) - 1)
+
+    def fingerprint(self):
+        """JSON-friendly description, used to detect stale cached tables."""
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "probs": list(self.probs),
+            "succ_step": self.succ_step,
+            "fail_step": self.fail_step,
+            "win_rule": rule_fingerprint(self.win_rule),
+            "symmetric": self.symmetric,
+        }
+
+
+DEFAULT_SPEC = StoneSpec()
+
+
+# --- State normalization ---
+# Successes above max(t1, t2) and penalties above t3 + 1 (lost) are equivalent
+# for the win rule, so every state is clamped before it indexes a table.
+# The solvers, the recommenders and the table lookups all go through these.
+
+def clamp_successes(s, t1, t2):
+    """Row1/Row2 successes: anything above max(t1, t2) is the same as max(t1, t2)."""
+    return np.minimum(s, max(t1, t2))
+
+
+def clamp_penalties(s3, t3):
+    """Row3 successes: anything above t3 is lost, stored as t3 + 1."""
+    return np.minimum(s3, t3 + 1)
+
+
+def normalize_state(c1, c2, c3, s1, s2, s3, p_idx, t1, t2, t3):
+    """Canonical (c1, c2, c3, s1, s2, s3, p_idx) for table lookups. Accepts ints or arrays."""
+    if np.isscalar(s1) and np.isscalar(s2) and np.isscalar(s3):
+        limit = max(t1, t2)
+        return (c1, c2, c3, min(s1, limit), min(s2, limit), min(s3, t3 + 1), p_idx)
+    return (c1, c2, c3, clamp_successes(s1, t1, t2), clamp_successes(s2, t1, t2),
+            clamp_penalties(s3, t3), p_idx)
+
+STONE_SPECS = {
+    spec.name: spec for spec in [
+        DEFAULT_SPEC,
+        StoneSpec(name="8-slot", slots=8),
+        StoneSpec(name="6-slot", slots=6),
+    ]
+}
+
+
+class QTable:
+    """
+    Solved Q-values for one (t1, t2, t3) target setting.
+    q[c1, c2, c3, s1, s2, s3, p_idx] -> (q1, q2, q3)
+    s1/s2 are clamped to max(t1, t2), s3 to t3 + 1 (lost).
+    Invalid moves (row already full) hold -1.0, like the recursive solver.
+    """
+    def __init__(self, q, t1, t2, t3, spec=DEFAULT_SPEC):
+        self.q = q
+        self.t1 = t1
+        self.t2 = t2
+        self.t3 = t3
+        self.spec = spec
+        self.solve_time = None
+
+    @property
+    def targets(self):
+        return (self.t1, self.t2, self.t3)
+
+    @property
+    def nbytes(self):
+        return self.q.nbytes
+
+    def lookup(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Return (q1, q2, q3) for a normalized state. O(1) array lookup."""
+        return tuple(self.q[c1, c2, c3, s1, s2, s3, p_idx].tolist())
+
+    def get_q_values(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Return (q1, q2, q3) for a raw game state (successes not clamped)."""
+        return self.lookup(*normalize_state(c1, c2, c3, s1, s2, s3, p_idx, *self.targets))
+
+    def get_q_values_many(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Vectorized get_q_values: state arrays of length k -> (k, 3) array."""
+        c1, c2, c3, s1, s2, s3, p_idx = normalize_state(c1, c2, c3, s1, s2, s3, p_idx, *self.targets)
+        # One flat take is much faster than a 7-array fancy index
+        flat = np.ravel_multi_index((c1, c2, c3, s1, s2, s3, p_idx), self.q.shape[:-1])
+        return np.asarray(self.q).reshape(-1, 3).take(flat, axis=0)
+
+
+def solve_dense_q_table(t1, t2, t3, spec=DEFAULT_SPEC):
+    """
+    Bottom-up solver. Fills a dense Q array layer by layer over the total
+    number of remaining slots (c1 + c2 + c3), each layer as vectorized array ops.
+    Produces the same floating point values as solve_reference().
+    Unreduced version of solve_q_table(), kept for equivalence checks.
+    """
+    start = time.perf_counter()
+    slots = spec.slots
+    limit = max(t1, t2)
+    lost = t3 + 1
+    n_c = slots + 1
+    n_s = limit + 1
+    n_s3 = t3 + 2
+    n_p = len(spec.probs)
+
+    prob = np.asarray(spec.probs, dtype=np.float64)
+    p_idx = np.arange(n_p)
+    p_succ = np.clip(p_idx + spec.succ_step, 0, n_p - 1)
+    p_fail = np.clip(p_idx + spec.fail_step, 0, n_p - 1)
+    succ12 = clamp_successes(np.arange(n_s) + 1, t1, t2)
+    succ3 = clamp_penalties(np.arange(n_s3) + 1, t3)
+
+    # V: value of a state under optimal play, Q: value of each move
+    V = np.zeros((n_c, n_c, n_c, n_s, n_s, n_s3, n_p))
+    Q = np.full((n_c, n_c, n_c, n_s, n_s, n_s3, n_p, 3), -1.0)
+
+    # Base Case: all slots filled -> win (1.0) or lose (0.0)
+    s1 = np.arange(n_s)[:, None, None]
+    s2 = np.arange(n_s)[None, :, None]
+    s3 = np.arange(n_s3)[None, None, :]
+    win = spec.win_rule(s1, s2, s3, t1, t2, t3)
+    V[0, 0, 0] = win[..., None]
+    Q[0, 0, 0, :, :, lost] = 0.0
+
+    cells = np.array([(a, b, c)
+                      for a in range(n_c) for b in range(n_c) for c in range(n_c)])
+    layer_of = cells.sum(axis=1)
+
+    for n in range(1, 3 * slots + 1):
+        C1, C2, C3 = cells[layer_of == n].T
+
+        # --- Row 1 ---
+        m = C1 > 0
+        if m.any():
+            a, b, c = C1[m], C2[m], C3[m]
+            child = V[a - 1, b, c]
+            v_succ = child[:, succ12][..., p_succ]
+            v_fail = child[..., p_fail]
+            Q[a, b, c, ..., 0] = prob * v_succ + (1 - prob) * v_fail
+
+        # --- Row 2 ---
+        m = C2 > 0
+        if m.any():
+            a, b, c = C1[m], C2[m], C3[m]
+            child = V[a, b - 1, c]
+            v_succ = child[:, :, succ12][..., p_succ]
+            v_fail = child[..., p_fail]
+            Q[a, b, c, ..., 1] = prob * v_succ + (1 - prob) * v_fail
+
+        # --- Row 3 ---
+        m = C3 > 0
+        if m.any():
+            a, b, c = C1[m], C2[m], C3[m]
+            child = V[a, b, c - 1]
+            # Success (Bad)
+            v_succ = child[:, :, :, succ3][..., p_succ]
+            # Fail (Good)
+            v_fail = child[..., p_fail]
+            Q[a, b, c, ..., 2] = prob * v_succ + (1 - prob) * v_fail
+
+        # Pruning: If Row 3 successes exceed max, we lost.
+        Q[C1, C2, C3, :, :, lost] = 0.0
+
+        # We pick the best move (invalid moves hold -1.0)
+        V[C1, C2, C3] = np.maximum(Q[C1, C2, C3].max(axis=-1), 0.0)
+
+    table = QTable(Q, t1, t2, t3, spec)
+    table.solve_time = time.perf_counter() - start
+    return table
+
+
+def pair_index(hi, lo):
+    """Index of the row-state pair (hi, lo), hi >= lo, in a lower-triangular layout."""
+    return hi * (hi + 1) // 2 + lo
+
+
+class SymmetricQTable:
+    """
+    Q-table reduced by the row1/row2 symmetry of the win condition.
+    Row states (c, s) are flattened to r = c * n_s + s and only pairs with
+    r1 >= r2 are stored, which is about half of the dense table:
+    q[pair_index(r1, r2), c3, s3, p_idx] -> (q1, q2, q3)
+    Lookups with r1 < r2 read the mirrored pair and swap q1/q2.
+    """
+    def __init__(self, q, t1, t2, t3, spec=DEFAULT_SPEC):
+        self.q = q
+        self.t1 = t1
+        self.t2 = t2
+        self.t3 = t3
+        self.spec = spec
+        self.solve_time = None
+        self.n_s = max(t1, t2) + 1
+
+    @property
+    def targets(self):
+        return (self.t1, self.t2, self.t3)
+
+    @property
+    def nbytes(self):
+        return self.q.nbytes
+
+    def lookup(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Return (q1, q2, q3) for a normalized state. O(1) array lookup."""
+        r1 = c1 * self.n_s + s1
+        r2 = c2 * self.n_s + s2
+        if r1 >= r2:
+            return tuple(self.q[pair_index(r1, r2), c3, s3, p_idx].tolist())
+        q2, q1, q3 = self.q[pair_index(r2, r1), c3, s3, p_idx].tolist()
+        return (q1, q2, q3)
+
+    def get_q_values(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Return (q1, q2, q3) for a raw game state (successes not clamped)."""
+        return self.lookup(*normalize_state(c1, c2, c3, s1, s2, s3, p_idx, *self.targets))
+
+    def get_q_values_many(self, c1, c2, c3, s1, s2, s3, p_idx):
+        """Vectorized get_q_values: state arrays of length k -> (k, 3) array."""
+        c1, c2, c3, s1, s2, s3, p_idx = normalize_state(c1, c2, c3, s1, s2, s3, p_idx, *self.targets)
+        r1 = c1 * self.n_s + s1
+        r2 = c2 * self.n_s + s2
+        pair = pair_index(np.maximum(r1, r2), np.minimum(r1, r2))
+        # One flat take is much faster than a 4-array fancy index
+        flat = np.ravel_multi_index((pair, c3, s3, p_idx), self.q.shape[:-1])
+        q = np.asarray(self.q).reshape(-1, 3).take(flat, axis=0)
+        swap = r1 < r2
+        return np.stack([np.where(swap, q[:, 1], q[:, 0]),
+                         np.where(swap, q[:, 0], q[:, 1]),
+                         q[:, 2]], axis=1)
+
+    def to_dense(self):
+        """Expand back to the dense [c1, c2, c3, s1, s2, s3, p_idx, move] layout."""
+        n_c = self.q.shape[1]
+        c1, c2, s1, s2 = np.meshgrid(np.arange(n_c), np.arange(n_c),
+                                     np.arange(self.n_s), np.arange(self.n_s), indexing='ij')
+        r1 = c1 * self.n_s + s1
+        r2 = c2 * self.n_s + s2
+        idx = pair_index(np.maximum(r1, r2), np.minimum(r1, r2))
+
+        dense = np.array(self.q[idx])
+        swap = r1 < r2
+        dense[swap, ..., 0], dense[swap, ..., 1] = dense[swap, ..., 1], dense[swap, ..., 0].copy()
+        # (c1, c2, s1, s2, c3, s3, p, move) -> (c1, c2, c3, s1, s2, s3, p, move)
+        return dense.transpose(0, 1, 4, 2, 3, 5, 6, 7)
+
+
+def solve_q_table(t1, t2, t3, spec=DEFAULT_SPEC):
+    """
+    Bottom-up solver over canonical states. The win condition is symmetric
+    under swapping row1 and row2, so (c1, s1, c2, s2) and (c2, s2, c1, s1)
+    share one entry (see SymmetricQTable). Same values as solve_dense_q_table().
+    Specs with a non-symmetric win rule get a dense table.
+    """
+    if not spec.symmetric:
+        return solve_dense_q_table(t1, t2, t3, spec)
+
+    start = time.perf_counter()
+    slots = spec.slots
+    limit = max(t1, t2)
+    lost = t3 + 1
+    n_c = slots + 1
+    n_s = limit + 1
+    n_s3 = t3 + 2
+    n_p = len(spec.probs)
+
+    prob = np.asarray(spec.probs, dtype=np.float64)
+    p_idx = np.arange(n_p)
+    p_succ = np.clip(p_idx + spec.succ_step, 0, n_p - 1)
+    p_fail = np.clip(p_idx + spec.fail_step, 0, n_p - 1)
+    succ3 = clamp_penalties(np.arange(n_s3) + 1, t3)
+
+    # Canonical row-state pairs (hi >= lo) and their (c, s) values
+    hi, lo = np.tril_indices(n_c * n_s)
+    c_a, s_a = np.divmod(hi, n_s)
+    c_b, s_b = np.divmod(lo, n_s)
+    n_pairs = len(hi)
+
+    def canonical(r1, r2):
+        return pair_index(np.maximum(r1, r2), np.minimum(r1, r2))
+
+    # Child pairs after filling a slot in row a (hi) or row b (lo).
+    # Rows that are already full get a dummy index; those moves are masked out.
+    next_a = np.maximum(c_a - 1, 0) * n_s
+    next_b = np.maximum(c_b - 1, 0) * n_s
+    a_succ = canonical(next_a + clamp_successes(s_a + 1, t1, t2), lo)
+    a_fail = canonical(next_a + s_a, lo)
+    b_succ = canonical(hi, next_b + clamp_successes(s_b + 1, t1, t2))
+    b_fail = canonical(hi, next_b + s_b)
+
+    V = np.zeros((n_pairs, n_c, n_s3, n_p))
+    Q = np.full((n_pairs, n_c, n_s3, n_p, 3), -1.0)
+
+    # Base Case: all slots filled -> win (1.0) or lose (0.0)
+    term = np.flatnonzero((c_a == 0) & (c_b == 0))
+    sa = s_a[term][:, None]
+    sb = s_b[term][:, None]
+    s3 = np.arange(n_s3)[None, :]
+    win = spec.win_rule(sa, sb, s3, t1, t2, t3)
+    V[term, 0] = win[..., None]
+    Q[term, 0, lost] = 0.0
+
+    # Every (pair, c3) cell, grouped into layers by total remaining slots
+    pair_of, c3_of = np.meshgrid(np.arange(n_pairs), np.arange(n_c), indexing='ij')
+    pair_of = pair_of.ravel()
+    c3_of = c3_of.ravel()
+    layer_of = c_a[pair_of] + c_b[pair_of] + c3_of
+
+    for n in range(1, 3 * slots + 1):
+        in_layer = layer_of == n
+        I, C3 = pair_of[in_layer], c3_of[in_layer]
+
+        # --- Row a ---
+        m = c_a[I] > 0
+        if m.any():
+            i, c = I[m], C3[m]
+            v_succ = V[a_succ[i], c][..., p_succ]
+            v_fail = V[a_fail[i], c][..., p_fail]
+            Q[i, c, ..., 0] = prob * v_succ + (1 - prob) * v_fail
+
+        # --- Row b ---
+        m = c_b[I] > 0
+        if m.any():
+            i, c = I[m], C3[m]
+            v_succ = V[b_succ[i], c][..., p_succ]
+            v_fail = V[b_fail[i], c][..., p_fail]
+            Q[i, c, ..., 1] = prob * v_succ + (1 - prob) * v_fail
+
+        # --- Row 3 ---
+        m = C3 > 0
+        if m.any():
+            i, c = I[m], C3[m]
+            child = V[i, c - 1]
+            # Success (Bad)
+            v_succ = child[:, succ3][..., p_succ]
+            # Fail (Good)
+            v_fail = child[..., p_fail]
+            Q[i, c, ..., 2] = prob * v_succ + (1 - prob) * v_fail
+
+        # Pruning: If Row 3 successes exceed max, we lost.
+        Q[I, C3, lost] = 0.0
+
+        # We pick the best move (invalid moves hold -1.0)
+        V[I, C3] = np.maximum(Q[I, C3].max(axis=-1), 0.0)
+
+    table = SymmetricQTable(Q, t1, t2, t3, spec)
+    table.solve_time = time.perf_counter() - start
+    return table
+
+
+def choose_moves(q, c1, c2, c3):
+    """
+    Policy from Q-values: index of the first best valid row for each state,
+    the same row recommend_move lists first. q: (k, 3) array.
+    """
+    # Column-wise ops: reductions over a length-3 axis are slow in NumPy
+    q1 = np.where(c1 > 0, q[:, 0], -np.inf)
+    q2 = np.where(c2 > 0, q[:, 1], -np.inf)
+    q3 = np.where(c3 > 0, q[:, 2], -np.inf)
+    best = np.maximum(np.maximum(q1, q2), q3) - 1e-9
+    return np.where(q1 >= best, 0, np.where(q2 >= best, 1, 2))
+
+
+class OutcomeDistribution:
+    """
+    Exact distribution of final results under the solver's policy.
+    final[s1, s2, s3]: probability of ending with these success counts.
+    """
+    def __init__(self, final, t1, t2, t3, spec=DEFAULT_SPEC):
+        self.final = final
+        self.t1 = t1
+        self.t2 = t2
+        self.t3 = t3
+        self.spec = spec
+
+    @property
+    def win_probability(self):
+        s1, s2, s3 = np.indices(self.final.shape)
+        win = self.spec.win_rule(s1, s2, s3, self.t1, self.t2, self.t3)
+        return float(self.final[win].sum())
+
+    def get_classes(self, max_penalty=None):
+        """
+        Probability of each final row1/row2 class, e.g. {'9/7': 0.01, ...}
+        (higher row first). max_penalty: only count results with s3 <= max_penalty.
+        """
+        final = self.final if max_penalty is None else self.final[:, :, :max_penalty + 1]
+        by_rows = final.sum(axis=2)
+        classes = {}
+        for s1, s2 in zip(*np.nonzero(by_rows)):
+            label = f"{max(s1, s2)}/{min(s1, s2)}"
+            classes[label] = classes.get(label, 0.0) + float(by_rows[s1, s2])
+        return classes
+
+    def get_top_classes(self, max_penalty=None):
+        """Probability by the higher row, e.g. {'9x': ..., '8x': ...}."""
+        top = {}
+        for label, prob in self.get_classes(max_penalty).items():
+            key = label.split('/')[0] + "x"
+            top[key] = top.get(key, 0.0) + prob
+        return top
+
+
+def outcome_distribution(table, c1, c2, c3, s1, s2, s3, p_idx):
+    """
+    One forward pass over the solved policy from the given (raw) state.
+    Probability mass is pushed layer by layer over the remaining slot count,
+    so every reachable state is visited once (no Monte Carlo).
+    """
+    spec = table.spec
+    n_c = spec.slots + 1
+    n_p = len(spec.probs)
+    probs = np.asarray(spec.probs)
+    # Layer-local states: (c1, c2, s1, s2, s3, p); c3 = n - c1 - c2
+    shape = (n_c, n_c, n_c, n_c, n_c, n_p)
+    size = int(np.prod(shape))
+
+    mass = np.zeros(size)
+    mass[np.ravel_multi_index((c1, c2, s1, s2, s3, p_idx), shape)] = 1.0
+
+    for n in range(c1 + c2 + c3, 0, -1):
+        flat = np.flatnonzero(mass)
+        m = mass[flat]
+        a, b, x, y, z, p = np.unravel_index(flat, shape)
+        c = n - a - b
+
+        move = choose_moves(table.get_q_values_many(a, b, c, x, y, z, p), a, b, c)
+        succ = np.clip(p + spec.succ_step, 0, n_p - 1)
+        fail = np.clip(p + spec.fail_step, 0, n_p - 1)
+        prob = probs[p]
+
+        # Row 3 keeps (c1, c2); its slot count is implied by the layer
+        on1, on2, on3 = move == 0, move == 1, move == 2
+        na = a - on1
+        nb = b - on2
+        dest_succ = np.ravel_multi_index((na, nb, x + on1, y + on2, z + on3, succ), shape)
+        dest_fail = np.ravel_multi_index((na, nb, x, y, z, fail), shape)
+
+        mass = (np.bincount(dest_succ, weights=m * prob, minlength=size)
+                + np.bincount(dest_fail, weights=m * (1 - prob), minlength=size))
+
+    final = mass.reshape(shape)[0, 0].sum(axis=-1)
+    return OutcomeDistribution(final, *table.targets, spec)
+
+
+@lru_cache(maxsize=None)
+def solve_reference(c1, c2, c3, s1, s2, s3, p_idx, t1, t2, t3, probs=PROBS):
+    """
+    Original recursive memoized solver. Kept as the reference implementation
+    for checking solve_q_table(); not used at runtime.
+    """
+    if s3 > t3:
+        return (0.0, 0.0, 0.0)
+
+    def get_value(nc1, nc2, nc3, ns1, ns2, ns3, np_idx):
+        if nc1 == 0 and nc2 == 0 and nc3 == 0:
+            if ns3 > t3: return 0.0
+            c1_win = (ns1 >= t1 and ns2 >= t2)
+            c2_win = (ns1 >= t2 and ns2 >= t1)
+            return 1.0 if (c1_win or c2_win) else 0.0
+
+        limit = max(t1, t2)
+        c_ns1 = min(ns1, limit)
+        c_ns2 = min(ns2, limit)
+        c_ns3 = min(ns3, t3 + 1)
+
+        qs = solve_reference(nc1, nc2, nc3, c_ns1, c_ns2, c_ns3, np_idx, t1, t2, t3, probs)
+
+        best = -1.0
+        if nc1 > 0: best = max(best, qs[0])
+        if nc2 > 0: best = max(best, qs[1])
+        if nc3 > 0: best = max(best, qs[2])
+        return best if best >= 0 else 0.0
+
+    def p_fail(pidx): return min(len(probs) - 1, pidx + 1)
+    def p_succ(pidx): return max(0, pidx - 1)
+
+    prob = probs[p_idx]
+
+    q1 = -1.0
+    if c1 > 0:
+        v_succ = get_value(c1-1, c2, c3, s1+1, s2, s3, p_succ(p_idx))
+        v_fail = get_value(c1-1, c2, c3, s1, s2, s3, p_fail(p_idx))
+        q1 = prob * v_succ + (1 - prob) * v_fail
+
+    q2 = -1.0
+    if c2 > 0:
+        v_succ = get_value(c1, c2-1, c3, s1, s2+1, s3, p_succ(p_idx))
+        v_fail = get_value(c1, c2-1, c3, s1, s2, s3, p_fail(p_idx))
+        q2 = prob * v_succ + (1 - prob) * v_fail
+
+    q3 = -1.0
+    if c3 > 0:
+        v_succ = get_value(c1, c2, c3-1, s1, s2, s3+1, p_succ(p_idx))
+        v_fail = get_value(c1, c2, c3-1, s1, s2, s3, p_fail(p_idx))
+        q3 = prob * v_succ + (1 - prob) * v_fail
+
+    return (q1, q2, q3)
+
+
+if __name__ == "__main__":
+    # Table size / solve time per spec, then equivalence checks:
+    # 1) symmetric table vs unreduced dense table (every state)
+    # 2) dense and symmetric tables vs recursive reference along random games
+    # Exits non-zero on any mismatch.
+    import random
+    import sys
+
+    failed = False
+
+    for spec in STONE_SPECS.values():
+        for t1, t2, t3 in [(min(9, spec.slots), min(7, spec.slots), 4)]:
+            table = solve_q_table(t1, t2, t3, spec)
+            print(f"{spec.name} ({t1},{t2},{t3}): {table.nbytes / 1e6:.1f} MB, "
+                  f"solved in {table.solve_time:.2f}s")
+
+    for t1, t2, t3 in [(9, 7, 4), (9, 6, 5)]:
+        dense = solve_dense_q_table(t1, t2, t3)
+        table = solve_q_table(t1, t2, t3)
+        print(f"({t1},{t2},{t3}) dense: {dense.solve_time:.2f}s {dense.nbytes / 1e6:.1f} MB, "
+              f"symmetric: {table.solve_time:.2f}s {table.nbytes / 1e6:.1f} MB")
+        same = np.array_equal(table.to_dense(), dense.q)
+        print(f"Symmetric == dense: {same}")
+        failed |= not same
+
+        rng = random.Random(0)
+        checked = mismatches = 0
+        for _ in range(500):
+            c, s, p_idx = [10, 10, 10], [0, 0, 0], len(PROBS) - 1
+            while sum(c) > 0:
+                state = normalize_state(*c, *s, p_idx, t1, t2, t3)
+                expected = solve_reference(*state, t1, t2, t3)
+                if table.lookup(*state) != expected or dense.lookup(*state) != expected:
+                    mismatches += 1
+                checked += 1
+                row = rng.choice([r for r in range(3) if c[r] > 0])
+                c[row] -= 1
+                if rng.random() < PROBS[p_idx]:
+                    s[row] += 1
+                    p_idx = max(0, p_idx - 1)
+                else:
+                    p_idx = min(len(PROBS) - 1, p_idx + 1)
+        print(f"Mismatches vs reference: {mismatches} / {checked}")
+        failed |= mismatches > 0
+        solve_reference.cache_clear()
+
+    sys.exit(1 if failed else 0)
@@ -1,17 +1,96 @@
-import mss
+import time
 import numpy as np
 from PIL import Image
-import pyautogui
 import cv2
+from capture import PerThreadCapture
+
+# Input is only needed live; replay and benchmarks run headless
+try:
+    import pyautogui
+except ImportError:
+    pyautogui = None
+
+ROW_NAMES = ('row1', 'row2', 'row3')
+SLOTS_PER_ROW = 10
+PATCH_RADIUS = 2 # 5x5 sample area around each slot center
+
+# Slot classification thresholds (see classify_slot)
+EMPTY_BRIGHTNESS = 145
+DOMINANCE_MARGIN = 20
+
+
+def array_to_image(bgra):
+    """PIL RGB image of a BGRA array, same as capture_region would return."""
+    h, w = bgra.shape[:2]
+    return Image.frombytes("RGB", (w, h), np.ascontiguousarray(bgra).tobytes(), "raw", "BGRX")
+
+
+class Frame:
+    """
+    One capture of the overlay region (plus the OCR box if it sticks out).
+    Slot analysis and OCR slice zero-copy views out of the same buffer, so
+    both see the same instant.
+    """
+    def __init__(self, bgra, region_info, origin=(0, 0), timestamp=None):
+        self.bgra = bgra
+        self.region_info = region_info
+        # Position of bgra[0, 0] relative to the overlay region's top-left
+        self.origin = origin
+        self.timestamp = timestamp if timestamp is not None else time.perf_counter()
+        # When the capture was asked for (earlier than timestamp if the caller had to wait)
+        self.requested_at = self.timestamp
+
+    def view(self, box):
+        """BGRA view of a box {'x1', 'y1', 'x2', 'y2'} in overlay coordinates."""
+        ox, oy = self.origin
+        return self.bgra[box['y1'] - oy:box['y2'] - oy, box['x1'] - ox:box['x2'] - ox]
+
+    def region_view(self):
+        """The overlay region itself, as analyze_array expects it."""
+        return self.view({'x1': 0, 'y1': 0,
+                          'x2': self.region_info['width'], 'y2': self.region_info['height']})
+
+
+class PatchChangeDetector:
+    """
+    Pixel-exact comparison of the slot patches against the last processed
+    frame. Idle ticks (nothing moved on the slots) are counted as skipped.
+    """
+    def __init__(self):
+        self.last = None
+        self.skipped = 0
+        self.processed = 0
+
+    def changed(self, patches):
+        if self.last is not None and np.array_equal(patches, self.last):
+            self.skipped += 1
+            return False
+        self.last = patches
+        self.processed += 1
+        return True
+
+    def remember(self, patches):
+        """Make patches the comparison base without counting a frame."""
+        self.last = patches
+
+    def reset(self):
+        # Next frame is always processed
+        self.last = None
+
+    def format(self):
+        total = self.skipped + self.processed
+        pct = self.skipped / total * 100 if total else 0.0
+        return f"Slot frames: {self.processed} processed, {self.skipped} skipped ({pct:.1f}% idle)"
+
 
 class Vision:
-    def __init__(self, coords):
-        self.coords = coords
-        self.row_y_offsets = {
-            'row1': self.coords['row1_y'],
-            'row2': self.coords['row2_y'],
-            'row3': self.coords['row3_y']
-        }
+    def __init__(self, coords, capture=None):
+        # Long-lived capture backend (see capture.py); close() releases it
+        self.capture = capture if capture is not None else PerThreadCapture()
+        self.update_coords(coords)
+
+    def close(self):
+        self.capture.close()
         
     def update_coords(self, coords):
         self.coords = coords
@@ -20,26 +99,112 @@ class Vision:
             'row2': self.coords['row2_y'],
             'row3': self.coords['row3_y']
         }
+
+        # Sample points of all 30 patches: (3 rows, 10 slots, 25 pixels).
+        # spacing_x may be fractional; pixel lookup truncates like PIL getpixel.
+        d = np.arange(-PATCH_RADIUS, PATCH_RADIUS + 1)
+        dy, dx = np.meshgrid(d, d, indexing='ij')
+        xs = self.coords['start_x'] + np.arange(SLOTS_PER_ROW) * self.coords['spacing_x']
+        ys = np.array([self.row_y_offsets[r] for r in ROW_NAMES])
+        self.sample_x = (xs[None, :, None] + dx.ravel()[None, None, :]).repeat(len(ROW_NAMES), axis=0)
+        self.sample_y = (ys[:, None, None] + dy.ravel()[None, None, :]).repeat(SLOTS_PER_ROW, axis=1)
+        self._sample_cache = None
         
     def capture_region(self, region):
-        with mss.mss() as sct:
-            screenshot = sct.grab(region)
-            return Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+        return array_to_image(self.capture.grab(region))
+
+    def capture_array(self, region):
+        """Grab a region as a BGRA array (no PIL conversion, no copy)."""
+        return self.capture.grab(region)
 
     def get_pixel_color(self, image, x, y):
         if 0 <= x < image.width and 0 <= y < image.height:
             return image.getpixel((x, y))
         return (0, 0, 0)
 
-    def analyze_state(self, region_info, debug=False):
+    def capture_frame(self, region_info, ocr_coords=None):
+        """Grab the overlay region, grown to include the OCR box, in one capture."""
+        x0, y0 = 0, 0
+        x1, y1 = region_info['width'], region_info['height']
+        if ocr_coords is not None:
+            x0, y0 = min(x0, ocr_coords['x1']), min(y0, ocr_coords['y1'])
+            x1, y1 = max(x1, ocr_coords['x2']), max(y1, ocr_coords['y2'])
         monitor = {
-            'top': region_info['y'],
-            'left': region_info['x'],
-            'width': region_info['width'],
-            'height': region_info['height']
+            'top': region_info['y'] + y0,
+            'left': region_info['x'] + x0,
+            'width': x1 - x0,
+            'height': y1 - y0
         }
-        img = self.capture_region(monitor)
-        
+        return Frame(self.capture_array(monitor), region_info, origin=(x0, y0))
+
+    def analyze_state(self, region_info, debug=False):
+        return self.analyze_frame(self.capture_frame(region_info), debug)
+
+    def analyze_frame(self, frame, debug=False):
+        return self.analyze_array(frame.region_view(), debug)
+
+    def analyze_frame_if_changed(self, frame, detector):
+        """
+        analyze_frame, or None if no slot patch changed since the last frame
+        the detector let through (skips classification and redraws).
+        """
+        patches = self.gather_patches(frame.region_view())
+        if not detector.changed(patches):
+            return None
+        return self.analyze_array(frame.region_view(), patches=patches)
+
+    def get_sample_indices(self, height, width):
+        """Integer pixel indices and in-bounds mask of all sample points for a frame size."""
+        if self._sample_cache is None or self._sample_cache[0] != (height, width):
+            valid = ((self.sample_x >= 0) & (self.sample_x < width) &
+                     (self.sample_y >= 0) & (self.sample_y < height))
+            ix = np.where(valid, self.sample_x, 0).astype(np.intp)
+            iy = np.where(valid, self.sample_y, 0).astype(np.intp)
+            self._sample_cache = ((height, width), iy, ix, valid)
+        return self._sample_cache[1:]
+
+    def gather_patches(self, bgra):
+        """Raw BGR pixels of all 30 slot patches, shape (3, 10, 25, 3) uint8."""
+        iy, ix, valid = self.get_sample_indices(*bgra.shape[:2])
+        # One gather for all 30 patches; out-of-frame pixels count as black
+        patches = bgra[iy, ix, :3]
+        patches[~valid] = 0
+        return patches
+
+    def sample_colors(self, bgra, patches=None):
+        """Average (r, g, b) of every slot patch as an int array of shape (3, 10, 3)."""
+        if patches is None:
+            patches = self.gather_patches(bgra)
+        avg_bgr = patches.sum(axis=2, dtype=np.int32) // patches.shape[2]
+        return avg_bgr[..., ::-1]
+
+    def analyze_array(self, bgra, debug=False, patches=None):
+        """analyze_state on an already captured BGRA frame."""
+        colors = self.sample_colors(bgra, patches)
+        states = self.classify_slots(colors)
+
+        row_states = {name: states[i].tolist() for i, name in enumerate(ROW_NAMES)}
+        if debug:
+            debug_info = {name: [f"[{r}/{g}/{b}]" for r, g, b in colors[i].tolist()]
+                          for i, name in enumerate(ROW_NAMES)}
+            return row_states, debug_info
+        return row_states
+
+    def classify_slots(self, colors):
+        """Vectorized classify_slot for a (3, 10, 3) array of average colors."""
+        r, g, b = colors[..., 0], colors[..., 1], colors[..., 2]
+        # Rows 1/2 succeed blue, row 3 succeeds red
+        blue_rows = np.array([True, True, False])[:, None]
+        success = np.where(blue_rows, b > r + DOMINANCE_MARGIN, r > b + DOMINANCE_MARGIN)
+        states = success.astype(np.int8)
+        states[r + g + b < 3 * EMPTY_BRIGHTNESS] = -1
+        return states
+
+    def analyze_image_reference(self, img, debug=False):
+        """
+        Original per-pixel implementation on a PIL image. Kept as the reference
+        for analyze_array (see __main__).
+        """
         row_states = {
             'row1': [],
             'row2': [],
@@ -83,21 +248,21 @@ class Vision:
         # Fail: ~160
         # Threshold: 145
         
-        if brightness < 145:
+        if brightness < EMPTY_BRIGHTNESS:
             return -1 # Empty
             
         # Success/Fail Check for non-empty slots
         if row_name in ['row1', 'row2']:
             # Blue Dominant
             # If Blue is significantly higher than Red
-            if b > r + 20: 
+            if b > r + DOMINANCE_MARGIN:
                 return 1 # Success
             else:
                 return 0 # Fail (Gray)
                 
         elif row_name == 'row3':
             # Red Dominant
-            if r > b + 20:
+            if r > b + DOMINANCE_MARGIN:
                 return 1 # Success
             else:
                 return 0 # Fail
@@ -118,10 +283,11 @@ class Vision:
             'height': ocr_coords['y2'] - ocr_coords['y1']
         }
         
-        with mss.mss() as sct:
-            screenshot = sct.grab(monitor)
-            img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-            img.save(filename)
+        array_to_image(self.capture.grab(monitor)).save(filename)
+
+    def get_ocr_view(self, frame, ocr_coords):
+        """BGRA view of the OCR box inside a captured frame (no extra grab)."""
+        return frame.view(ocr_coords)
 
     def get_ocr_image(self, region_info, ocr_coords):
         monitor = {
@@ -131,8 +297,5 @@ class Vision:
             'height': ocr_coords['y2'] - ocr_coords['y1']
         }
         
-        with mss.mss() as sct:
-            screenshot = sct.grab(monitor)
-            # Convert to numpy array (BGRA -> BGR)
-            img_np = np.array(screenshot)
-            return cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+        # BGRA -> BGR
+        return cv2.cvtColor(self.capture.grab(monitor), cv2.COLOR_BGRA2BGR)
@@ -0,0 +1,88 @@
+"""
+Equivalence check of Vision.analyze_state (vectorized) against the
+per-pixel analyze_image_reference, on synthetic or recorded frames.
+
+    python vision_check.py                  # synthetic frames
+    python vision_check.py captures/*.png   # recorded frames
+"""
+import sys
+import time
+import cv2
+import numpy as np
+
+from capture import FileCaptureBackend
+from overlay_geometry import overlay_coords
+from vision import ROW_NAMES, SLOTS_PER_ROW, Vision, array_to_image
+
+LAYOUTS = {
+    'FHD': ('FHD', 1.0),
+    'QHD': ('QHD', 1.0),
+    'FHD x1.25': ('FHD', 1.25),
+    'QHD x0.9': ('QHD', 0.9),
+}
+
+
+def synthetic_frame(vision, rng, height, width):
+    """Noisy BGRA frame with random empty/fail/success colors painted on every slot."""
+    frame = rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+    palette = [(125, 128, 132), (160, 160, 165), (90, 140, 230), (230, 110, 90)] # RGB
+    for row_name in ROW_NAMES:
+        y = vision.row_y_offsets[row_name]
+        for i in range(SLOTS_PER_ROW):
+            x = int(vision.coords['start_x'] + i * vision.coords['spacing_x'])
+            r, g, b = palette[rng.integers(len(palette))]
+            patch = frame[max(0, y - 3):y + 4, max(0, x - 3):x + 4]
+            patch[..., :3] = np.clip(np.array([b, g, r]) + rng.integers(-25, 26, size=patch.shape[:2] + (3,)), 0, 255)
+    return frame
+
+
+def load_frames(paths):
+    """[(path, BGRA array)] of the images that could be read."""
+    frames = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            print(f"Could not read {path}")
+            continue
+        frames.append((path, cv2.cvtColor(img, cv2.COLOR_BGR2BGRA) if img.shape[2] == 3 else img))
+    return frames
+
+
+def check(frames=None, seed=0):
+    """Compare both paths on every layout. Returns (total, mismatches, fast seconds, reference seconds)."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    total = 0
+    fast_time = ref_time = 0.0
+    for name, (resolution, scale) in LAYOUTS.items():
+        coords = overlay_coords(resolution, scale)
+        vision = Vision(coords)
+        tests = frames or [(f"synthetic {i}", synthetic_frame(vision, rng, 480, 640)) for i in range(20)]
+        # Cropped frame: slots near/over the edge read as black
+        tests = tests + [("cropped", synthetic_frame(vision, rng, 480, 640)[:coords['row3_y'] + 1, :300])]
+        for label, bgra in tests:
+            # Full analyze_state path, served by the file-backed capture fake
+            vision.capture = FileCaptureBackend([bgra])
+            region = {'x': 0, 'y': 0, 'width': bgra.shape[1], 'height': bgra.shape[0]}
+            start = time.perf_counter()
+            fast = vision.analyze_state(region, debug=True)
+            fast_time += time.perf_counter() - start
+
+            img = array_to_image(bgra)
+            start = time.perf_counter()
+            ref = vision.analyze_image_reference(img, debug=True)
+            ref_time += time.perf_counter() - start
+
+            total += 1
+            if fast != ref:
+                mismatches += 1
+                print(f"Mismatch: {name} / {label}")
+    return total, mismatches, fast_time, ref_time
+
+
+if __name__ == "__main__":
+    total, mismatches, fast_time, ref_time = check(load_frames(sys.argv[1:]))
+    print(f"{total} frames, {mismatches} mismatches; "
+          f"vectorized {fast_time / total * 1000:.3f} ms/frame, "
+          f"reference {ref_time / total * 1000:.3f} ms/frame")
+    sys.exit(1 if mismatches else 0)